@@ -0,0 +1,97 @@
+"""
+Compares the json encoders available for api responses on payloads shaped
+like the post and question list responses.
+
+Usage: python -m benchmarks.json_encoding [--posts N] [--repeat N]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from drp import encoding
+
+
+PARAGRAPH = ("Patients presenting with suspected sepsis should have "
+             "observations recorded at least every 30 minutes, with "
+             "escalation to the outreach team if the NEWS2 score is 5 or "
+             "above. Blood cultures must be taken before antibiotics are "
+             "started, unless this would delay treatment by more than an "
+             "hour. ") * 4
+
+
+def make_post(i, now):
+    return {
+        "id": i,
+        "title": f"Guideline {i}: management of sepsis in adults",
+        "summary": "Recognition, escalation and first hour treatment.",
+        "content": "\n\n".join([PARAGRAPH] * 8),
+        "is_guideline": i % 3 == 0,
+        "is_current": True,
+        "revision_id": i * 7,
+        "created_at": (now - timedelta(hours=i)).isoformat(),
+        "tags": [{"id": t, "name": f"Tag {t}"} for t in range(0, i % 4)],
+        "files": [{"id": i * 2 + f, "name": f"protocol_{f}.pdf", "post": i}
+                  for f in range(0, i % 3)],
+    }
+
+
+def make_question(i, post):
+    return {
+        "id": i,
+        "site": {"id": 1, "name": "St Mary's"},
+        "grade": "fy1",
+        "specialty": "Acute medicine",
+        "subject": {"id": 2, "name": "Sepsis"},
+        "text": "When should antibiotics be escalated? " * 3,
+        "resolved": post is not None,
+        "resolved_by": post,
+        "user": 1,
+    }
+
+
+def flask_restful_default(data):
+    # What flask_restful.representations.json.output_json does
+    return (json.dumps(data) + "\n").encode("utf-8")
+
+
+def stdlib_compact(data):
+    return json.dumps(data, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    posts = [make_post(i, now) for i in range(0, args.posts)]
+    questions = [make_question(i, posts[i] if i % 2 == 0 else None)
+                 for i in range(0, args.posts)]
+
+    encoders = [("flask_restful default", flask_restful_default),
+                ("stdlib compact (fallback)", stdlib_compact)]
+    if encoding.orjson is not None:
+        encoders.append(("orjson", encoding.orjson.dumps))
+    else:
+        print("orjson is not installed, only the fallback is measured\n")
+
+    for name, payload in [("posts", posts), ("questions", questions)]:
+        size = len(flask_restful_default(payload))
+        print(f"{name}: {len(payload)} items, {size / 1024:.0f} KiB")
+
+        baseline = None
+        for encoder_name, encoder in encoders:
+            seconds = min(timeit.repeat(lambda: encoder(payload),
+                                        number=args.repeat, repeat=3))
+            per_call = seconds / args.repeat * 1000
+            baseline = baseline or per_call
+            print(f"  {encoder_name:<28}{per_call:8.2f} ms"
+                  f"{baseline / per_call:8.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
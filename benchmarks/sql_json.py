@@ -0,0 +1,78 @@
+"""
+Compares serializing posts through the ORM with building their json inside
+Postgres (the SQL_JSON option).
+
+Posts are inserted into the configured database inside a transaction that
+is rolled back at the end, so the database is left unchanged.
+
+Usage: python -m benchmarks.sql_json [--posts N] [--repeat N]
+"""
+import argparse
+import timeit
+
+from drp import create_app, encoding, fragments
+from drp.api.posts import encode_revisions
+from drp.db import db
+from drp.models import Post, Tag, File
+
+from .json_encoding import PARAGRAPH
+
+
+def create_posts(count):
+    tags = [Tag(name=f"Benchmark tag {t}") for t in range(0, 4)]
+    posts = [Post(title=f"Guideline {i}: management of sepsis in adults",
+                  summary="Recognition, escalation and first hour treatment.",
+                  content="\n\n".join([PARAGRAPH] * 8),
+                  is_guideline=i % 3 == 0, tags=tags[:i % 4])
+             for i in range(0, count)]
+    files = [File(name=f"protocol_{f}.pdf", filename=f"protocol_{f}.pdf",
+                  post=post)
+             for i, post in enumerate(posts) for f in range(0, i % 3)]
+
+    db.session.add_all(posts + files)
+    db.session.flush()
+
+    return [post.id for post in posts]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            ids = create_posts(args.posts)
+
+            def orm():
+                # Measure serialization rather than the fragment cache
+                fragments.reset()
+                app.config["SQL_JSON"] = False
+                return encoding.dumps(encode_revisions(ids))
+
+            def sql():
+                app.config["SQL_JSON"] = True
+                return encoding.dumps(encode_revisions(ids))
+
+            assert orm() == sql(), "the outputs differ"
+
+            size = len(orm())
+            print(f"{args.posts} posts, {size / 1024:.0f} KiB")
+
+            baseline = None
+            for name, path in [("ORM", orm), ("SQL_JSON", sql)]:
+                seconds = min(timeit.repeat(path, number=args.repeat,
+                                            repeat=3))
+                per_call = seconds / args.repeat * 1000
+                baseline = baseline or per_call
+                print(f"  {name:<28}{per_call:8.2f} ms"
+                      f"{baseline / per_call:8.1f}x")
+        finally:
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 from flask import Flask, escape, request
 from flask_restful import Api
 
-from . import config, api as res
+from . import cache, compression, config, encoding, api as res
 from .db import db
 from .mail import mail
 from .swag import swag
+from .catalog import catalog
+from .tasks import tasks
 
 
 def init_cli(app):
@@ -13,20 +15,32 @@ def init_cli(app):
         app.cli.add_command(cli.seed)
         app.cli.add_command(cli.create_user)
         app.cli.add_command(cli.delete_user)
+        app.cli.add_command(cli.render_posts)
+        app.cli.add_command(cli.send_notifications)
+        app.cli.add_command(cli.compact_revisions)
+        app.cli.add_command(cli.collect_files)
+        app.cli.add_command(cli.rebuild_search_vectors)
 
 
 def init_api(app):
     api = Api(app)
+    api.representations["application/json"] = encoding.output_json
 
     api.add_resource(res.PostResource, "/api/posts/<int:id>")
     api.add_resource(res.PostListResource, "/api/posts")
+    api.add_resource(res.PostChangesResource, "/api/posts/changes")
+    api.add_resource(res.PostRevisionListResource,
+                     "/api/posts/<int:id>/revisions")
+    api.add_resource(res.PostDiffResource, "/api/posts/<int:id>/diff")
 
     api.add_resource(res.RevisionResource, "/api/revisions/<int:id>")
 
     api.add_resource(res.PostFetchResource, "/api/fetch/posts/")
+    api.add_resource(res.RevisionFetchResource, "/api/fetch/revisions/")
 
     api.add_resource(res.PostSearchResource,
                      "/api/search/posts/<string:searched>")
+    api.add_resource(res.SearchSuggestResource, "/api/search/suggest")
 
     api.add_resource(res.TagResource, "/api/tags/<int:id>")
     api.add_resource(res.TagListResource, "/api/tags")
@@ -50,12 +64,14 @@ def init_api(app):
     app.register_blueprint(res.questions, url_prefix="/api/questions")
     app.register_blueprint(res.notifications, url_prefix="/api/notifications")
     app.register_blueprint(res.users, url_prefix="/api/users")
+    app.register_blueprint(res.metrics, url_prefix="/api/metrics")
 
     app.register_blueprint(res.auth, url_prefix="/auth")
 
 
 def create_app(test_config=None):
     app = Flask(__name__)
+    app.json_encoder = encoding.JSONEncoder
 
     # Load configuration
     app.config["SQLALCHEMY_DATABASE_URI"] = config.DATABASE_URI
@@ -70,12 +86,27 @@ def create_app(test_config=None):
     app.config["MAIL_PASSWORD"] = config.MAIL_PASSWORD
     app.config["MAIL_DEFAULT_SENDER"] = config.MAIL_DEFAULT_SENDER
 
+    app.config["RESPONSES_CACHE_SIZE"] = config.RESPONSES_CACHE_SIZE
+    app.config["HISTORY_CACHE_SIZE"] = config.HISTORY_CACHE_SIZE
+    app.config["DIFFS_CACHE_SIZE"] = config.DIFFS_CACHE_SIZE
+    app.config["FRAGMENTS_CACHE_SIZE"] = config.FRAGMENTS_CACHE_SIZE
+    app.config["SEARCHES_CACHE_SIZE"] = config.SEARCHES_CACHE_SIZE
+    app.config["SEARCH_QUERIES_CACHE_SIZE"] = config.SEARCH_QUERIES_CACHE_SIZE
+    app.config["CATALOG_ENABLED"] = config.CATALOG_ENABLED
+    app.config["SQL_JSON"] = config.SQL_JSON
+    app.config["COMPACT_REVISIONS"] = config.COMPACT_REVISIONS
+    app.config["COMPRESS_MIN_SIZE"] = config.COMPRESS_MIN_SIZE
+
     if test_config is not None:
         app.config.update(test_config)
 
     # Register app with database
     db.init_app(app)
 
+    cache.init_app(app)
+
+    compression.init_app(app)
+
     # Run database migrations
     # with app.app_context():
     #     import flask_migrate
@@ -83,6 +114,10 @@ def create_app(test_config=None):
 
     mail.init_app(app)
 
+    tasks.init_app(app)
+
+    catalog.init_app(app)
+
     # Register cli commands
     init_cli(app)
 
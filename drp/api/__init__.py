@@ -1,7 +1,9 @@
 from .auth import auth
 from .posts import (PostResource, PostListResource, RevisionResource,
-                    PostFetchResource)
-from .search import PostSearchResource
+                    PostFetchResource, PostChangesResource,
+                    PostRevisionListResource, PostDiffResource,
+                    RevisionFetchResource)
+from .search import PostSearchResource, SearchSuggestResource
 from .tags import TagListResource, TagResource
 from .files import (FileResource, FileListResource, RawFileViewResource,
                     RawFileDownloadResource)
@@ -9,15 +11,18 @@ from .questions import QuestionResource, QuestionListResource, questions
 from .site import SiteResource, SiteListResource
 from .subject import SubjectResource, SubjectListResource
 from .notifications import notifications
+from .metrics import metrics
 from .users import users
 
 __all__ = ["PostResource", "PostListResource",
-           "RevisionResource", "PostFetchResource",
-           "PostSearchResource",
+           "RevisionResource", "PostFetchResource", "PostChangesResource",
+           "RevisionFetchResource",
+           "PostRevisionListResource", "PostDiffResource",
+           "PostSearchResource", "SearchSuggestResource",
            "TagResource", "TagListResource",
            "QuestionResource", "QuestionListResource",
            "FileResource", "FileListResource",
            "RawFileViewResource", "RawFileDownloadResource",
            "SiteResource", "SiteListResource",
            "SubjectResource", "SubjectListResource",
-           "notifications", "questions", "auth", "users"]
+           "notifications", "questions", "auth", "users", "metrics"]
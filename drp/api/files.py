@@ -4,8 +4,9 @@ from datetime import datetime
 from flask import current_app, request, send_from_directory
 from flask_restful import Resource, abort
 
+from .. import attachments, cache, changes
 from ..db import db
-from ..models import File, Post
+from ..models import File, Post, ChangeKind
 from ..swag import swag
 
 
@@ -75,15 +76,18 @@ class FileResource(Resource):
         if file is None:
             return abort(404)
 
-        try:
-            os.remove(os.path.join(
-                current_app.config['UPLOAD_FOLDER'], file.filename))
-        except OSError as e:
-            print("Could not delete file, " + repr(e))
+        post = file.post
+        if post is not None:
+            changes.record(ChangeKind.UPDATED, post)
 
-        db.session.delete(file)
+        attachments.discard(file)
         db.session.commit()
 
+        if post is not None:
+            cache.invalidate_posts(post.post_id)
+
+        attachments.schedule()
+
         return '', 204
 
 
@@ -166,8 +170,11 @@ class FileListResource(Resource):
         file = File(name=name, filename=filename, post=post)
 
         db.session.add(file)
+        changes.record(ChangeKind.UPDATED, post)
         db.session.commit()
 
+        cache.invalidate_posts(post.post_id)
+
         return serialize_file(file)
 
 
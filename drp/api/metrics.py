@@ -0,0 +1,48 @@
+from flask import Blueprint, jsonify
+
+from sqlalchemy.sql import func
+
+from .. import attachments, cache
+from ..catalog import catalog
+from ..db import db
+from ..models import Notification, FileTombstone
+
+from .utils import require_admin
+
+metrics = Blueprint("metrics", __name__)
+
+
+@metrics.route("/", methods=["GET"])
+@require_admin
+def index():
+    """
+    Reports runtime statistics of the current server process.
+    ---
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Success
+      401:
+        description: Not authorized
+    """
+    notifications = db.session.query(Notification.status,
+                                     func.count(Notification.id)) \
+        .group_by(Notification.status).all()
+
+    tombstones = db.session.query(FileTombstone.attempts,
+                                  func.count(FileTombstone.id)) \
+        .group_by(FileTombstone.attempts).all()
+
+    return jsonify({
+        "caches": {name: c.stats() for name, c in cache.caches.items()},
+        "catalog": catalog.stats(),
+        "notifications": {status.name.lower(): count
+                          for status, count in notifications},
+        "file_tombstones": {
+            "pending": sum(count for attempts, count in tombstones
+                           if attempts < attachments.MAX_ATTEMPTS),
+            "abandoned": sum(count for attempts, count in tombstones
+                             if attempts >= attachments.MAX_ATTEMPTS),
+        },
+    })
@@ -0,0 +1,65 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+
+from dateutil.parser import isoparse
+from flask_restful import abort
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values):
+    """
+    Encodes the sort key of the last row of a page as an opaque token that
+    can be used to fetch the following page.
+    """
+    values = [v.isoformat() if isinstance(v, datetime) else v
+              for v in values]
+    data = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def decode_cursor(token, *types):
+    """
+    Decodes a cursor token produced by `encode_cursor`, checking that it
+    contains values of the given types. Timestamps without a time zone are
+    taken to be in UTC. Aborts with a 400 if the token is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, binascii.Error):
+        return abort(400, message="Invalid cursor.")
+
+    if not isinstance(values, list) or len(values) != len(types):
+        return abort(400, message="Invalid cursor.")
+
+    decoded = []
+    for value, type in zip(values, types):
+        try:
+            if type is datetime:
+                value = isoparse(value)
+                # Timestamps are stored with a time zone
+                if value.tzinfo is None:
+                    value = value.replace(tzinfo=timezone.utc)
+            elif type is float and isinstance(value, int):
+                value = float(value)
+            elif not isinstance(value, type) or isinstance(value, bool):
+                raise ValueError()
+        except (TypeError, ValueError):
+            return abort(400, message="Invalid cursor.")
+        decoded.append(value)
+
+    return decoded
+
+
+def next_cursor_headers(rows, per_page, key):
+    """
+    Returns the headers pointing to the page after `rows`, or no headers if
+    `rows` is the last page.
+    """
+    if per_page is None or len(rows) < per_page or len(rows) == 0:
+        return {}
+
+    return {NEXT_CURSOR_HEADER: encode_cursor(*key(rows[-1]))}
@@ -7,25 +7,33 @@ from datetime import datetime
 
 from flask import request, current_app
 from flask_restful import Resource, abort
-
+from sqlalchemy import tuple_, select, literal_column
+from sqlalchemy.dialects.postgresql import TEXT, aggregate_order_by
+from sqlalchemy.orm import selectinload, load_only
+from sqlalchemy.sql import func
+from sqlalchemy.sql.expression import cast
+
+from .. import attachments, cache, changes, encoding, fragments, revisions
+from ..catalog import catalog
+from ..compression import PrecompressedBody
+from ..rendering import render_content
 from ..db import db
-from ..models import Post, Post_Tag, Tag, File, Question
+from ..models import (Post, CurrentPost, Post_Tag, Tag, File, Question,
+                      PostChange, ChangeKind)
 from ..swag import swag
 
 from .. import notifications
 from .tags import serialize_tag
 from .files import serialize_file, allowed_file
+from .pagination import encode_cursor, decode_cursor, next_cursor_headers
+from . import sql_json
+from .utils import make_etag, not_modified
 
 
 def delete_post(post):
+    # Files are removed from disk by a background task after the commit
     for file in post.files:
-        try:
-            os.remove(os.path.join(
-                current_app.config['UPLOAD_FOLDER'], file.filename))
-        except OSError as e:
-            print("Could not delete file, " + repr(e))
-
-        db.session.delete(file)
+        attachments.discard(file)
 
     db.session.delete(post)
 
@@ -40,13 +48,154 @@ def unresolve_all(questions):
         question.resolved = False
 
 
+def current_posts():
+    """Query of the current revisions of posts, through their pointers."""
+    return Post.query.join(CurrentPost, CurrentPost.revision_id == Post.id)
+
+
 def get_current_post_by_id(id):
-    return Post.query.filter(Post.is_current & (Post.post_id == id)) \
-        .one_or_none()
+    return current_posts().filter(CurrentPost.post_id == id).one_or_none()
+
+
+# Fields of a serialized post, in order, with the way to compute each one
+POST_FIELDS = {
+    "id": lambda post: post.post_id,
+    "title": lambda post: post.title,
+    "summary": lambda post: revisions.text(post).summary,
+    "content": lambda post: revisions.text(post).content,
+    "is_guideline": lambda post: post.is_guideline,
+    "is_current": lambda post: post.is_current,
+    "revision_id": lambda post: post.id,
+    "created_at":
+        lambda post: post.created_at.astimezone(pytz.utc).isoformat(),
+    "tags": lambda post: [serialize_tag(tag) for tag in post.tags],
+    "files": lambda post: [serialize_file(file) for file in post.files],
+    "content_html": lambda post: revisions.content_html(post),
+}
+
+# Fields serialized unless others are requested
+DEFAULT_FIELDS = [field for field in POST_FIELDS if field != "content_html"]
+
+# Columns that are only loaded if the corresponding field is requested. The
+# others are small, and needed for pagination and caching.
+DEFERRABLE_COLUMNS = {"title", "summary", "content", "content_html",
+                      "is_guideline"}
+
+# Fields of revisions that may be stored as deltas
+TEXT_FIELDS = {"summary", "content", "content_html"}
+
+
+def parse_fields():
+    """
+    Reads the fields to serialize from the `fields` query parameter, a comma
+    separated list. Returns None if all fields should be serialized.
+    """
+    fields = request.args.get("fields")
+
+    if fields is None:
+        return None
+
+    fields = {field.strip() for field in fields.split(",")} - {""}
+
+    unknown = fields - POST_FIELDS.keys()
+    if len(unknown) > 0:
+        return abort(400, message="Unknown fields: "
+                     f"{', '.join(sorted(unknown))}.")
+
+    return [field for field in POST_FIELDS if field in fields]
+
+
+def with_relations(query, fields=None):
+    """
+    Eagerly loads the tags and files of every post matched by the query, so
+    that serializing a page of posts takes a constant number of queries.
+    If `fields` is given, only the columns and relations needed to serialize
+    those fields are loaded.
+    """
+    if fields is None:
+        return query.options(selectinload(Post.tags),
+                             selectinload(Post.files))
+
+    columns = [column for column in DEFERRABLE_COLUMNS if column in fields]
+    if len(TEXT_FIELDS.intersection(fields)) > 0:
+        columns += ["delta", "delta_base_id"]
+
+    options = [load_only("id", "post_id", "is_current", "created_at",
+                         *columns)]
+
+    if "tags" in fields:
+        options.append(selectinload(Post.tags))
+    if "files" in fields:
+        options.append(selectinload(Post.files))
+
+    return query.options(*options)
+
+
+def fingerprint(query):
+    """
+    Summarises the posts matched by the query, together with their tags and
+    files, in a single query that does not load any post content. Any write
+    that changes how the matched posts serialize changes the summary, which
+    makes it suitable for building entity tags.
+    """
+    ids = select([query.with_entities(Post.id.label("id"))
+                  .cte("fingerprinted").c.id])
+
+    revisions = select([
+        func.count(Post.id),
+        func.count(Post.id).filter(Post.is_current),
+        func.max(Post.id),
+        func.sum(Post.id),
+        func.max(Post.created_at),
+    ]).where(Post.id.in_(ids)).alias("revision_summary")
+
+    files = select([
+        func.count(File.id),
+        func.max(File.id),
+        func.sum(File.id),
+    ]).where(File.post_id.in_(ids)).alias("file_summary")
+
+    tag = cast(Post_Tag.post_id, TEXT) + ":" + cast(Tag.id, TEXT) + ":" \
+        + Tag.name
+    tags = select([
+        func.md5(func.string_agg(tag, aggregate_order_by(
+            literal_column("','"), Post_Tag.post_id, Tag.id))),
+    ]).select_from(Post_Tag.__table__.join(Tag.__table__)) \
+        .where(Post_Tag.post_id.in_(ids)).alias("tag_summary")
+
+    return tuple(db.session.query(revisions, files, tags).one())
+
+
+def etag_headers(etag):
+    return {"ETag": f'"{etag}"'}
+
+
+def cached_response(key, etag, build):
+    """
+    Responds with the cached body and headers for `key` if they were built
+    for the same entity tag, otherwise builds them with `build` and caches
+    them. Checking the tag keeps the cache consistent with writes made by
+    other processes.
+
+    Bodies are cached encoded, along with their compressed variants.
+    """
+    key = key + (tuple(sorted(request.args.items(multi=True))),)
+    entry = cache.responses.get(key, valid=lambda entry: entry[0] == etag)
+
+    if entry is None:
+        data, headers = build()
+        entry = (etag, PrecompressedBody(encoding.dumps(data)), headers)
+        cache.responses.set(key, entry)
+
+    _, body, headers = entry
+    response = current_app.response_class(
+        mimetype="application/json",
+        headers=dict(headers, **etag_headers(etag)))
+    return body.apply(response)
 
 
 @swag.definition("Post")
-def serialize_post(post):
+def serialize_post(post, fields=None):
     """
     Represents a post revision.
     ---
@@ -75,19 +224,88 @@ def serialize_post(post):
         type: boolean
       revision_id:
         type: integer
+      content_html:
+        type: string
+        description: The content rendered to html. Only returned if
+          requested through the `fields` parameter.
     """
-    return {
-        "id": post.post_id,
-        "title": post.title,
-        "summary": post.summary,
-        "content": post.content,
-        "is_guideline": post.is_guideline,
-        "is_current": post.is_current,
-        "revision_id": post.id,
-        "created_at": post.created_at.astimezone(pytz.utc).isoformat(),
-        "tags": [serialize_tag(tag) for tag in post.tags],
-        "files": [serialize_file(file) for file in post.files]
-    }
+    if fields is None:
+        fields = DEFAULT_FIELDS
+
+    return {field: POST_FIELDS[field](post) for field in fields}
+
+
+def serialize_revisions(ids, fields=None):
+    """
+    Serializes the revisions with the given ids, in order, assembling them
+    from cached fragments. Only the revisions missing from the cache are
+    loaded, and ids of revisions that do not exist are skipped.
+    """
+    if fields is None:
+        fields = DEFAULT_FIELDS
+
+    fragments.sync()
+
+    found = {}
+    for id in ids:
+        fragment = fragments.get(id, fields)
+        if fragment is not None:
+            found[id] = fragment
+
+    missing = {id for id in ids if id not in found}
+
+    if len(missing) > 0:
+        # Only the requested fields are loaded, and cached along with any
+        # others already cached
+        query = with_relations(Post.query.filter(Post.id.in_(missing)),
+                               fields)
+        for revision in query:
+            found[revision.id] = fragments.put(
+                revision.id, serialize_post(revision, fields))
+
+    return [{field: found[id][field] for field in fields}
+            for id in ids if id in found]
+
+
+def encode_revisions(ids, fields=None):
+    """
+    Returns the encoded list of the revisions with the given ids, in order.
+    If the `SQL_JSON` config option is set, the revisions are encoded by the
+    database, otherwise they are serialized by `serialize_revisions`.
+    """
+    if not current_app.config["SQL_JSON"]:
+        return serialize_revisions(ids, fields)
+
+    if fields is None:
+        fields = DEFAULT_FIELDS
+
+    encoded = sql_json.select_posts(ids, fields)
+
+    # Revisions stored as deltas are rebuilt here
+    deltas = [id for id, body in encoded.items() if body is None]
+    for id, data in zip(deltas, serialize_revisions(deltas, fields)):
+        encoded[id] = encoding.dumps(data)
+
+    return encoding.Encoded(
+        b"[" + b",".join(encoded[id] for id in ids if id in encoded) + b"]")
+
+
+def from_catalog(snapshot, entries, fields=None, headers=None):
+    """
+    Responds with posts from the in-memory catalog, tagged with the version
+    of the catalog.
+    """
+    if fields is None:
+        fields = DEFAULT_FIELDS
+
+    etag = make_etag("catalog", snapshot.version)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
+    data = [{field: entry.data[field] for field in fields}
+            for entry in entries]
+    return data, 200, dict(headers or {}, **etag_headers(etag))
 
 
 class PostResource(Resource):
@@ -109,34 +327,59 @@ class PostResource(Resource):
             in: query
             type: boolean
             required: false
+          - name: fields
+            in: query
+            type: string
+            required: false
+            description: Comma separated list of the post fields to return.
         responses:
           200:
             schema:
               type: array
               items:
                 $ref: "#/definitions/Post"
+          304:
+            description: Not modified
           404:
             description: Not found
         """
         include_old = request.args.get("include_old")
         reverse = request.args.get("reverse")
+        fields = parse_fields()
 
-        query = Post.query.filter(Post.post_id == id)
+        snapshot = catalog.snapshot() if include_old != "true" else None
+        if snapshot is not None:
+            entry = snapshot.get(id)
+            if entry is None:
+                return abort(404)
+            return from_catalog(snapshot, [entry], fields)
 
-        if include_old != "true":
-            query = query.filter(Post.is_current)
+        if include_old == "true":
+            query = Post.query.filter(Post.post_id == id)
+        else:
+            query = current_posts().filter(CurrentPost.post_id == id)
 
         if reverse == "true":
             query = query.order_by(Post.id.desc())
         else:
             query = query.order_by(Post.id)
 
-        posts = query.all()
+        summary = fingerprint(query)
 
-        if len(posts) == 0:
+        # The first field of the fingerprint is the number of revisions
+        if summary[0] == 0:
             return abort(404)
 
-        return [serialize_post(post) for post in posts]
+        etag = make_etag(*summary)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        def build():
+            ids = [id for id, in query.with_entities(Post.id)]
+            return serialize_revisions(ids, fields), {}
+
+        return cached_response(("post", id), etag, build)
 
     def delete(self, id):
         """
@@ -163,8 +406,14 @@ class PostResource(Resource):
             #  Mark associated questions as unresolved
             unresolve_all(revision.resolves)
 
+        changes.record(ChangeKind.DELETED, post_id=id)
+
         db.session.commit()
 
+        cache.invalidate_posts(id)
+
+        attachments.schedule()
+
         return "", 204
 
 
@@ -193,17 +442,34 @@ class PostListResource(Resource):
           - name: per_page
             in: query
             type: integer
+          - name: cursor
+            in: query
+            type: string
+            description: Opaque token from the X-Next-Cursor header of the
+              previous page. Takes precedence over `page`.
+          - name: fields
+            in: query
+            type: string
+            required: false
+            description: Comma separated list of the post fields to return.
         responses:
           200:
             schema:
               type: array
               items:
                 $ref: "#/definitions/Post"
-
+            headers:
+              X-Next-Cursor:
+                type: string
+                description: Cursor for the next page, if there is one.
+          304:
+            description: Not modified
         """
         guidelines_only = request.args.get("guidelines_only")
         include_old = request.args.get("include_old")
         tag = request.args.get("tag")
+        cursor = request.args.get("cursor")
+        fields = parse_fields()
 
         page = request.args.get("page")
         if page is None:
@@ -215,6 +481,31 @@ class PostListResource(Resource):
         if per_page is not None:
             per_page = int(per_page)
 
+        if cursor is not None:
+            after = decode_cursor(cursor, datetime, int)
+
+        snapshot = catalog.snapshot() if include_old != "true" else None
+        if snapshot is not None:
+            entries = snapshot.ordered
+
+            if guidelines_only == "true":
+                entries = [e for e in entries if e.is_guideline]
+            if tag is not None:
+                entries = [e for e in entries if tag in e.tags]
+
+            if cursor is not None:
+                entries = [e for e in entries
+                           if [e.created_at, e.revision_id] < after]
+            elif per_page is not None:
+                entries = entries[page * per_page:]
+
+            if per_page is not None:
+                entries = entries[:per_page]
+
+            headers = next_cursor_headers(
+                entries, per_page, lambda e: (e.created_at, e.revision_id))
+            return from_catalog(snapshot, entries, fields, headers)
+
         query = Post.query
 
         if guidelines_only == "true":
@@ -224,12 +515,29 @@ class PostListResource(Resource):
         if tag is not None:
             query = query.join(Post_Tag).join(Tag).filter(Tag.name == tag)
 
-        query = query.order_by(Post.created_at.desc())
+        query = query.order_by(Post.created_at.desc(), Post.id.desc())
 
-        if per_page is not None:
+        if cursor is not None:
+            query = query.filter(
+                tuple_(Post.created_at, Post.id) < tuple_(*after))
+            if per_page is not None:
+                query = query.limit(per_page)
+        elif per_page is not None:
             query = query.limit(per_page).offset(page * per_page)
 
-        return [serialize_post(post) for post in query]
+        etag = make_etag(*fingerprint(query))
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        def build():
+            rows = query.with_entities(Post.id, Post.created_at).all()
+            headers = next_cursor_headers(
+                rows, per_page, lambda row: (row.created_at, row.id))
+            return encode_revisions([row.id for row in rows], fields), \
+                headers
+
+        return cached_response(("list",), etag, build)
 
     def post(self):
         """
@@ -320,16 +628,14 @@ class PostListResource(Resource):
             return abort(400, message=error_message("summary", 200))
 
         # Check that tags are valid
-        tags = None
+        tags = []
 
         if len(tag_names) != 0:
-            tags = Tag.query.filter(Tag.name.in_(tag_names))
-            if tags.count() < len(tag_names):
+            tags = Tag.query.filter(Tag.name.in_(tag_names)).all()
+            if len(tags) < len(set(tag_names)):
                 return abort(400, message="Invalid tags - all tags must be"
                              " predefined through the tags api.")
 
-        tags = tags.all() if tags is not None else []
-
         # Check that files and the associated names are valid
         if len(files) != len(names):
             return abort(400, message="The number of files must match "
@@ -354,42 +660,47 @@ class PostListResource(Resource):
 
         # Check that all resolved questions exist and are not resolved already
         resolved_questions = []
-        if resolves is not None:
-            if len(resolves) == 1 and ',' in resolves[0]:
-                resolves = resolves[0].split(',')
-            for question_id in resolves:
-                question = Question.query.filter(
-                    Question.id == question_id).one_or_none()
-                if question is None:
-                    abort(400, message="One of the resolved questions does "
-                          "not exist")
-                if question.resolved:
-                    abort(
-                        400, message="Cannot resolve question that is already "
-                        "resolved.")
-                resolved_questions.append(question)
-
-        # Add post to the database
+        if len(resolves) == 1 and ',' in resolves[0]:
+            resolves = resolves[0].split(',')
+        if len(resolves) > 0:
+            try:
+                resolves = {int(question_id) for question_id in resolves}
+            except ValueError:
+                abort(400, message="One of the resolved questions does "
+                      "not exist")
+            resolved_questions = Question.query \
+                .filter(Question.id.in_(resolves)).all()
+            if len(resolved_questions) < len(resolves):
+                abort(400, message="One of the resolved questions does "
+                      "not exist")
+            if any(question.resolved for question in resolved_questions):
+                abort(
+                    400, message="Cannot resolve question that is already "
+                    "resolved.")
+
+        # Revisions are immutable, so their html only needs rendering once
+        content_html = render_content(content)
+
+        # Add post to the database. Tags, files and resolved questions are
+        # written with one statement each, whatever their number, once the
+        # post has been inserted.
+        old_post = None
         if is_guideline == "true" and updates is not None:
             old_post = get_current_post_by_id(updates)
             if old_post is None or not old_post.is_guideline:
                 return abort(400, message="Invalid updated post ID.")
             post = Post(title=title, summary=summary, content=content,
-                        is_guideline=True, post_id=updates, tags=tags)
-            old_post.is_current = False
-            migrate_resolved_questions(old_post.resolves, post)
+                        content_html=content_html, is_guideline=True,
+                        post_id=old_post.post_id)
         else:
             post = Post(title=title, summary=summary, content=content,
-                        is_guideline=(is_guideline == "true"), tags=tags)
+                        content_html=content_html,
+                        is_guideline=(is_guideline == "true"))
 
-        # Link resolved questions to the post
-        if len(resolved_questions) > 0:
-            post.resolves = resolved_questions
-            for question in resolved_questions:
-                question.resolved = True
         db.session.add(post)
 
         # Save files
+        saved_files = []
         for i in range(0, len(files)):
             # Prefix file name with current time and random number to allow
             # files with the same name
@@ -407,21 +718,63 @@ class PostListResource(Resource):
                              "message.")
             files[i].save(path)
 
-            file = File(name=names[i], filename=filename, post=post)
+            saved_files.append({"name": names[i], "filename": filename})
 
-            db.session.add(file)
+        # Logging takes the lock serializing change log writes until the
+        # commit, so it is left until the files are saved
+        if old_post is not None:
+            old_post.is_current = False
+            changes.record(ChangeKind.SUPERSEDED, old_post)
 
-        db.session.commit()
+        # Inserts the post, which assigns its ids
+        changes.record(ChangeKind.CREATED, post)
+
+        if len(tags) > 0:
+            db.session.execute(Post_Tag.__table__.insert().values(
+                [{"post_id": post.id, "tag_id": tag.id} for tag in tags]))
+
+        if len(saved_files) > 0:
+            db.session.execute(File.__table__.insert().values(
+                [dict(file, post_id=post.id) for file in saved_files]))
+
+        # Link resolved questions to the post
+        if old_post is not None:
+            db.session.execute(Question.__table__.update()
+                               .where(Question.post_id == old_post.id)
+                               .values(post_id=post.id))
 
         if len(resolved_questions) > 0:
-            for q in resolved_questions:
-                notifications.send_user(
-                    q.user, "Your question has been resolved",
-                    q.text, data={"id": post.id, "resolves": q.id})
+            db.session.execute(Question.__table__.update()
+                               .where(Question.id.in_(resolves))
+                               .values(resolved=True, post_id=post.id))
+
+        # Only keep the changes from the new revision for the old one
+        if old_post is not None and current_app.config["COMPACT_REVISIONS"]:
+            revisions.compact(old_post, post)
+
+        # Notifications are stored with the post and only sent after the
+        # commit, by a background task, so that slow push requests do not
+        # hold up the response
+        queued = [notifications.send_user(
+            q.user_id, "Your question has been resolved",
+            q.text, data={"id": post.id, "resolves": q.id})
+            for q in resolved_questions if q.user_id is not None]
+
+        queued.append(notifications.broadcast(title, summary,
+                                              data={"id": post.post_id}))
+
+        queued = notifications.queue(queued)
+
+        # Serialized before committing, which would expire the post
+        response = serialize_post(post)
+
+        db.session.commit()
 
-        notifications.broadcast(title, summary, data={"id": post.post_id})
+        cache.invalidate_posts(post.post_id)
 
-        return serialize_post(post)
+        notifications.dispatch(queued)
+
+        return response
 
 
 class RevisionResource(Resource):
@@ -435,19 +788,36 @@ class RevisionResource(Resource):
             in: path
             type: integer
             required: true
+          - name: fields
+            in: query
+            type: string
+            required: false
+            description: Comma separated list of the post fields to return.
         responses:
           200:
             schema:
               $ref: "#/definitions/Post"
+          304:
+            description: Not modified
           404:
             description: Not found
         """
-        revision = Post.query.filter(Post.id == id).one_or_none()
+        fields = parse_fields()
 
-        if revision is None:
+        query = Post.query.filter(Post.id == id)
+
+        summary = fingerprint(query)
+
+        # The first field of the fingerprint is the number of revisions
+        if summary[0] == 0:
             return abort(404)
 
-        return serialize_post(revision)
+        etag = make_etag(*summary)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        return serialize_revisions([id], fields)[0], 200, etag_headers(etag)
 
     def delete(self, id):
         """
@@ -469,15 +839,21 @@ class RevisionResource(Resource):
         if revision is None:
             return abort(404)
 
+        post_id = revision.post_id
+
+        # Revisions stored relative to this one need a new base
+        revisions.detach(revision)
+
+        changes.record(ChangeKind.REVISION_DELETED, revision)
         delete_post(revision)
 
         if revision.is_current:
-            revisions = Post.query.filter(
-                Post.post_id == revision.post_id) \
-                .order_by(Post.id.desc()).all()
-            if len(revisions) > 0:
-                newest = revisions[0]
+            newest = Post.query.filter(Post.post_id == revision.post_id) \
+                .order_by(Post.id.desc()).first()
+            if newest is not None:
                 newest.is_current = True
+                revisions.expand(newest)
+                changes.record(ChangeKind.UPDATED, newest)
 
                 # Make resolved questions point to the new current revison
                 migrate_resolved_questions(revision.resolves, newest)
@@ -486,14 +862,341 @@ class RevisionResource(Resource):
 
         db.session.commit()
 
+        cache.invalidate_posts(post_id)
+
+        attachments.schedule()
+
         return "", 204
 
 
+# Fields of the revisions listed in the history of a post, unless others are
+# requested
+HISTORY_FIELDS = ["title", "is_current", "revision_id", "created_at"]
+
+
+class PostRevisionListResource(Resource):
+
+    def get(self, id):
+        """
+        Gets the revisions of a post, newest first, one page at a time.
+        ---
+        parameters:
+          - name: id
+            in: path
+            type: integer
+            required: true
+          - name: per_page
+            in: query
+            type: integer
+            required: false
+            description: Number of revisions per page, 20 by default.
+          - name: cursor
+            in: query
+            type: string
+            required: false
+            description: Opaque token from the X-Next-Cursor header of the
+              previous page.
+          - name: fields
+            in: query
+            type: string
+            required: false
+            description: Comma separated list of the post fields to return.
+              Only revision metadata is returned by default.
+        responses:
+          200:
+            schema:
+              type: array
+              items:
+                $ref: "#/definitions/Post"
+            headers:
+              X-Next-Cursor:
+                type: string
+                description: Cursor for the next page, if there is one.
+          304:
+            description: Not modified
+          404:
+            description: Not found
+        """
+        per_page = request.args.get("per_page", "20")
+        cursor = request.args.get("cursor")
+        fields = parse_fields() or HISTORY_FIELDS
+
+        if not per_page.isdigit() or int(per_page) == 0:
+            return abort(400, message="`per_page` must be a positive number.")
+        per_page = int(per_page)
+
+        query = Post.query.filter(Post.post_id == id)
+
+        if cursor is not None:
+            revision_id, = decode_cursor(cursor, int)
+            query = query.filter(Post.id < revision_id)
+
+        query = query.order_by(Post.id.desc()).limit(per_page)
+
+        summary = fingerprint(query)
+
+        # The first field of the fingerprint is the number of revisions
+        if summary[0] == 0 and cursor is None:
+            return abort(404)
+
+        etag = make_etag(*summary)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        ids = [id for id, in query.with_entities(Post.id)]
+        headers = next_cursor_headers(ids, per_page, lambda id: (id,))
+
+        return serialize_revisions(ids, fields), 200, \
+            dict(headers, **etag_headers(etag))
+
+
+@swag.definition("DiffChunk")
+def serialize_chunk(chunk):
+    """
+    A piece of text that is unchanged, deleted or inserted between two
+    revisions.
+    ---
+    properties:
+      op:
+        type: string
+        enum: [equal, delete, insert]
+      text:
+        type: string
+    """
+    op, text = chunk
+    return {"op": op, "text": text}
+
+
+class PostDiffResource(Resource):
+
+    def get(self, id):
+        """
+        Gets the differences between two revisions of a post.
+        ---
+        parameters:
+          - name: id
+            in: path
+            type: integer
+            required: true
+          - name: from
+            in: query
+            type: integer
+            required: true
+            description: ID of the older revision.
+          - name: to
+            in: query
+            type: integer
+            required: true
+            description: ID of the newer revision.
+        responses:
+          200:
+            schema:
+              type: object
+              properties:
+                from:
+                  type: integer
+                to:
+                  type: integer
+                title:
+                  type: array
+                  items:
+                    $ref: "#/definitions/DiffChunk"
+                summary:
+                  type: array
+                  items:
+                    $ref: "#/definitions/DiffChunk"
+                content:
+                  type: array
+                  items:
+                    $ref: "#/definitions/DiffChunk"
+          304:
+            description: Not modified
+          404:
+            description: Not found
+        """
+        from_id = request.args.get("from")
+        to_id = request.args.get("to")
+
+        if from_id is None or to_id is None \
+                or not from_id.isdigit() or not to_id.isdigit():
+            return abort(400, message="`from` and `to` must be revision IDs.")
+
+        from_id = int(from_id)
+        to_id = int(to_id)
+
+        query = Post.query.filter(
+            (Post.post_id == id) & Post.id.in_([from_id, to_id]))
+
+        # Revisions never change, so checking that they still exist is enough
+        # to know that a cached diff is valid
+        count = query.with_entities(func.count(Post.id)).scalar()
+        if count < len({from_id, to_id}):
+            return abort(404)
+
+        etag = make_etag()
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        key = (id, from_id, to_id)
+        body = cache.diffs.get(key)
+
+        if body is None:
+            revisions_by_id = {revision.id: revision for revision in
+                               with_relations(query, ["title", "summary",
+                                                      "content"])}
+            old = revisions_by_id[from_id]
+            new = revisions_by_id[to_id]
+
+            data = {"from": from_id, "to": to_id}
+            for field in ["title", "summary", "content"]:
+                chunks = revisions.diff(POST_FIELDS[field](old),
+                                        POST_FIELDS[field](new))
+                data[field] = [serialize_chunk(chunk) for chunk in chunks]
+
+            body = PrecompressedBody(encoding.dumps(data))
+            cache.diffs.set(key, body)
+
+        response = current_app.response_class(mimetype="application/json",
+                                              headers=etag_headers(etag))
+        return body.apply(response)
+
+
+def read_ids():
+    """
+    Reads the `ids` query parameter, given either repeated or as a single
+    comma separated list.
+    """
+    ids = request.args.getlist("ids")
+
+    if len(ids) == 1 and ',' in ids[0]:
+        ids = ids[0].split(',')
+
+    if len(ids) == 1 and ids[0] == "":
+        return []
+
+    return ids
+
+
 class PostFetchResource(Resource):
 
     def get(self):
         """
         Returns a list of posts identified by the supplied IDs.
+        Clients holding a revision of a post can send its ID along with the
+        post ID, as `post_id:revision_id`. The post is then only returned if
+        its current revision is a different one, and the response lists the
+        posts that no longer exist.
+        ---
+        parameters:
+          - name: ids
+            in: query
+            type: array
+            items:
+              type: string
+            required: true
+            description: Post IDs, optionally followed by `:` and the ID of
+              the revision held by the client.
+          - name: fields
+            in: query
+            type: string
+            required: false
+            description: Comma separated list of the post fields to return.
+        responses:
+          200:
+            description: A list of posts, or if revision IDs were given, an
+              object with the changed posts and the IDs of missing posts.
+            schema:
+              type: object
+              properties:
+                posts:
+                  type: array
+                  items:
+                    $ref: "#/definitions/Post"
+                missing:
+                  type: array
+                  items:
+                    type: integer
+          304:
+            description: Not modified
+          404:
+            description: Not found
+        """
+        ids = read_ids()
+        fields = parse_fields()
+
+        if any(':' in id for id in ids):
+            return self.get_changed(ids, fields)
+
+        if len(ids) == 0:
+            return []
+
+        if not all(id.isdigit() for id in ids):
+            abort(400, message="IDs must be integers")
+
+        snapshot = catalog.snapshot()
+        if snapshot is not None:
+            entries = [snapshot.get(id) for id in sorted({int(id)
+                                                          for id in ids})]
+            return from_catalog(snapshot, [e for e in entries
+                                           if e is not None], fields)
+
+        query = current_posts().filter(CurrentPost.post_id.in_(ids))
+
+        etag = make_etag(*fingerprint(query))
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        ids = [id for id, in query.with_entities(Post.id)]
+
+        return encode_revisions(ids, fields), 200, etag_headers(etag)
+
+    def get_changed(self, ids, fields):
+        held = {}
+        for id in ids:
+            post_id, _, revision_id = id.partition(':')
+            if not post_id.isdigit() or \
+                    (revision_id != "" and not revision_id.isdigit()):
+                abort(400, message="IDs must be integers")
+            held[int(post_id)] = int(revision_id) if revision_id else None
+
+        snapshot = catalog.snapshot()
+        if snapshot is not None:
+            entries = {post_id: snapshot.get(post_id) for post_id in held}
+            current = {post_id: entry.revision_id
+                       for post_id, entry in entries.items()
+                       if entry is not None}
+        else:
+            # Only the pointers are read to find out what changed
+            current = dict(db.session.query(CurrentPost.post_id,
+                                            CurrentPost.revision_id)
+                           .filter(CurrentPost.post_id.in_(held.keys())))
+
+        changed = [(post_id, revision_id) for post_id, revision_id in
+                   sorted(current.items()) if held[post_id] != revision_id]
+
+        if snapshot is not None:
+            posts = [{field: entries[post_id].data[field]
+                      for field in fields or DEFAULT_FIELDS}
+                     for post_id, _ in changed]
+        else:
+            posts = serialize_revisions(
+                [revision_id for _, revision_id in changed], fields)
+
+        return {
+            "posts": posts,
+            "missing": sorted(held.keys() - current.keys()),
+        }
+
+
+class RevisionFetchResource(Resource):
+
+    def get(self):
+        """
+        Returns a list of revisions identified by the supplied IDs. IDs of
+        revisions that do not exist are ignored.
         ---
         parameters:
           - name: ids
@@ -502,27 +1205,143 @@ class PostFetchResource(Resource):
             items:
               type: number
             required: true
+          - name: fields
+            in: query
+            type: string
+            required: false
+            description: Comma separated list of the post fields to return.
         responses:
           200:
             schema:
               type: array
               items:
                 $ref: "#/definitions/Post"
-          404:
-            description: Not found
+          304:
+            description: Not modified
         """
-        ids = request.args.getlist("ids")
-
-        if len(ids) == 1 and ',' in ids[0]:
-            ids = ids[0].split(',')
+        ids = read_ids()
+        fields = parse_fields()
 
-        if len(ids) == 1 and ids[0] == "":
+        if len(ids) == 0:
             return []
 
         if not all(id.isdigit() for id in ids):
             abort(400, message="IDs must be integers")
 
-        posts = Post.query.filter(
-            Post.is_current & Post.post_id.in_(ids)).all()
+        query = Post.query.filter(Post.id.in_(ids)).order_by(Post.id)
+
+        etag = make_etag(*fingerprint(query))
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        ids = [id for id, in query.with_entities(Post.id)]
+
+        return encode_revisions(ids, fields), 200, etag_headers(etag)
 
-        return [serialize_post(post) for post in posts]
+
+class PostChangesResource(Resource):
+
+    def get(self):
+        """
+        Gets the changes made to posts since a cursor.
+        Clients should obtain a cursor before downloading the posts they
+        want to keep in sync, by calling this endpoint without `since`.
+        ---
+        parameters:
+          - name: since
+            in: query
+            type: string
+            required: false
+            description: The cursor returned by a previous call. If omitted,
+              no changes are returned, only the current cursor.
+          - name: limit
+            in: query
+            type: integer
+            required: false
+            description: The maximum number of log entries to process, at
+              least 1. Defaults to 500.
+        responses:
+          200:
+            schema:
+              type: object
+              properties:
+                revisions:
+                  type: array
+                  description: Revisions created or modified since the
+                    cursor, in their current state.
+                  items:
+                    $ref: "#/definitions/Post"
+                superseded:
+                  type: array
+                  description: IDs of revisions that stopped being current.
+                  items:
+                    type: integer
+                deleted_revisions:
+                  type: array
+                  items:
+                    type: integer
+                deleted:
+                  type: array
+                  description: IDs of posts deleted with all revisions.
+                  items:
+                    type: integer
+                cursor:
+                  type: string
+                more:
+                  type: boolean
+                  description: Whether further changes are available.
+        """
+        since = request.args.get("since")
+        limit = request.args.get("limit", "500")
+
+        if not limit.isdigit() or int(limit) < 1:
+            return abort(400, message="`limit` must be a positive number.")
+
+        if since is None:
+            head = db.session.query(func.max(PostChange.id)).scalar()
+            return serialize_changes([], [], head or 0, False)
+
+        since, = decode_cursor(since, int)
+
+        query = PostChange.query.filter(PostChange.id > since) \
+            .order_by(PostChange.id)
+
+        # Fetch one extra entry to find out whether there are more
+        entries = query.limit(int(limit) + 1).all()
+        more = len(entries) > int(limit)
+        entries = entries[:int(limit)]
+
+        head = entries[-1].id if len(entries) > 0 else since
+
+        revision_ids = {entry.revision_id for entry in entries
+                        if entry.revision_id is not None}
+
+        revisions = serialize_revisions(sorted(revision_ids))
+
+        return serialize_changes(entries, revisions, head, more)
+
+
+def serialize_changes(entries, revisions, head, more):
+    deleted_posts = {entry.post_id for entry in entries
+                     if entry.kind == ChangeKind.DELETED}
+    # Revisions of deleted posts may still be served from fragments
+    revisions = [revision for revision in revisions
+                 if revision["id"] not in deleted_posts]
+    existing = {revision["revision_id"] for revision in revisions}
+
+    return {
+        "revisions": revisions,
+        "superseded": sorted({
+            entry.revision_id for entry in entries
+            if entry.kind == ChangeKind.SUPERSEDED
+            and entry.revision_id in existing}),
+        "deleted_revisions": sorted({
+            entry.revision_id for entry in entries
+            if entry.revision_id is not None
+            and entry.revision_id not in existing
+            and entry.post_id not in deleted_posts}),
+        "deleted": sorted(deleted_posts),
+        "cursor": encode_cursor(head),
+        "more": more,
+    }
@@ -1,5 +1,6 @@
 from flask import Blueprint, request
 from flask_restful import Resource, abort
+from sqlalchemy.orm import selectinload
 
 from ..db import db
 from ..models import Question, Site, Subject, Grade, User
@@ -7,7 +8,7 @@ from ..swag import swag
 
 from .site import serialize_site
 from .subject import serialize_subject
-from .posts import serialize_post
+from .posts import serialize_revisions
 
 
 questions = Blueprint("questions", __name__)
@@ -28,7 +29,7 @@ def resolve(id):
 
 
 @swag.definition("Question")
-def serialize_question(question):
+def serialize_question(question, resolved_by=None):
     """
     Represents a question.
     ---
@@ -57,6 +58,9 @@ def serialize_question(question):
       text:
         type: string
     """
+    if resolved_by is None and question.post_id is not None:
+        resolved_by = serialize_revisions([question.post_id])[0]
+
     return {
         "id": question.id,
         "site": serialize_site(question.site),
@@ -65,12 +69,22 @@ def serialize_question(question):
         "subject": serialize_subject(question.subject),
         "text": question.text,
         "resolved": question.resolved,
-        "resolved_by": serialize_post(question.resolved_by)
-        if question.resolved_by is not None else None,
+        "resolved_by": resolved_by,
         "user": question.user_id,
     }
 
 
+def serialize_questions(questions):
+    """
+    Serializes several questions, assembling the posts that resolve them
+    from cached fragments in one go.
+    """
+    ids = [q.post_id for q in questions if q.post_id is not None]
+    posts = {post["revision_id"]: post for post in serialize_revisions(ids)}
+
+    return [serialize_question(q, posts.get(q.post_id)) for q in questions]
+
+
 class QuestionResource(Resource):
 
     def get(self, id):
@@ -181,9 +195,10 @@ class QuestionListResource(Resource):
               items:
                 $ref: "#/definitions/Question"
         """
-        questions = Question.query.all()
-        return [serialize_question(question)
-                for question in questions]
+        questions = Question.query.options(
+            selectinload(Question.site),
+            selectinload(Question.subject)).all()
+        return serialize_questions(questions)
 
     def post(self):
         """
@@ -292,4 +307,4 @@ class QuestionListResource(Resource):
 
         db.session.commit()
 
-        return [serialize_question(q) for q in qs]
+        return serialize_questions(qs)
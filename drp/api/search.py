@@ -1,16 +1,24 @@
-from sqlalchemy import text, case
+from datetime import datetime
+
+from sqlalchemy import (text, case, or_, and_, tuple_, distinct, select,
+                        literal, union_all, column)
 from sqlalchemy.sql import func
 from sqlalchemy.sql.expression import cast
-from sqlalchemy.dialects.postgresql import TEXT
+from sqlalchemy.dialects.postgresql import TEXT, REAL, DOUBLE_PRECISION
 
 from flask import request
 from flask_restful import Resource, abort
 
-from .posts import serialize_post
+from .. import encoding, revisions
+from ..search import cached, normalize
+from .posts import (DEFAULT_FIELDS, encode_revisions, serialize_revisions,
+                    parse_fields)
+from .pagination import decode_cursor, next_cursor_headers
 
 from ..models import Post, Post_Tag, Tag
 
 from ..db import db
+from ..swag import swag
 
 
 def construct_fulltext_query_and_rank(searched):
@@ -33,10 +41,22 @@ def construct_fulltext_query_and_rank(searched):
     # Final text search query
     ts_query = func.to_tsquery('english', prefix_ts_query_text)
     # Rank for each search result
-    ts_rank = func.ts_rank_cd(Post.__ts_vector__, ts_query).label("rank")
+    ts_rank = func.ts_rank_cd(Post.search_vector, ts_query)
     return (ts_query, ts_rank)
 
 
+def after_cursor(query, ts_rank, cursor):
+    """Restricts a ranked search query to the results following a cursor."""
+    rank, created_at, id = decode_cursor(cursor, float, datetime, int)
+    # ts_rank_cd returns a real, so the rank from the cursor must be compared
+    # at the same precision
+    rank = cast(rank, REAL)
+    return query.filter(or_(
+        ts_rank < rank,
+        and_(ts_rank == rank,
+             tuple_(Post.created_at, Post.id) < tuple_(created_at, id))))
+
+
 def limit_query(query, page, results_per_page):
     page = int(page)
     results_per_page = int(results_per_page)
@@ -44,9 +64,134 @@ def limit_query(query, page, results_per_page):
     return query.limit(results_per_page).offset(page * results_per_page)
 
 
-def extract_results_posts(query):
-    return [serialize_post(result[0])
-            for result in query.all()]
+def count_facets(query):
+    """
+    Counts the results of a search query in total, by tag and by whether they
+    are guidelines, in a single pass over the matching posts.
+    """
+    matches = query.with_entities(
+        Post.id, func.coalesce(Post.is_guideline, False).label("is_guideline")
+    ).subquery()
+
+    rows = db.session.query(
+        func.grouping(Tag.name), func.grouping(matches.c.is_guideline),
+        Tag.name, matches.c.is_guideline, func.count(distinct(matches.c.id))) \
+        .select_from(matches) \
+        .outerjoin(Post_Tag, Post_Tag.post_id == matches.c.id) \
+        .outerjoin(Tag, Tag.id == Post_Tag.tag_id) \
+        .group_by(func.grouping_sets(text("()"), Tag.name,
+                                     matches.c.is_guideline))
+
+    total = 0
+    tags = {}
+    guidelines = {"true": 0, "false": 0}
+    for by_tag, by_guideline, tag, is_guideline, count in rows:
+        if by_tag == 0:
+            # Untagged posts form a group of their own
+            if tag is not None:
+                tags[tag] = count
+        elif by_guideline == 0:
+            guidelines["true" if is_guideline else "false"] = count
+        else:
+            total = count
+
+    return {"total": total,
+            "facets": {"tags": tags, "is_guideline": guidelines}}
+
+
+def with_facets(posts, facets):
+    """Adds facet counts to a page of results, which may be encoded."""
+    if isinstance(posts, encoding.Encoded):
+        # Splices the encoded facets into an object after the posts
+        return encoding.Encoded(b'{"posts":' + posts + b"," +
+                                encoding.dumps(facets)[1:])
+
+    return {"posts": posts, **facets}
+
+
+# Bounds the length of snippets. Matches are highlighted in markdown, like
+# the content they are taken from.
+SNIPPET_OPTIONS = "MaxFragments=2, MaxWords=20, MinWords=8, " \
+    "StartSel=**, StopSel=**, FragmentDelimiter=\" ... \""
+
+
+def make_snippets(ids, ts_query):
+    """
+    Highlights the matches of a search in the content of the revisions with
+    the given ids, returning a dictionary from revision id to snippet. Only
+    the revisions of a page of results should be passed, since snippets are
+    costly to make.
+    """
+    if len(ids) == 0:
+        return {}
+
+    def headline(content):
+        return func.ts_headline("english", content, ts_query,
+                                SNIPPET_OPTIONS)
+
+    rows = db.session.query(Post.id, Post.delta.isnot(None),
+                            headline(Post.content)) \
+        .filter(Post.id.in_(ids)).all()
+
+    snippets = {id: snippet for id, is_delta, snippet in rows
+                if not is_delta}
+
+    # Revisions stored as deltas only have their content rebuilt here, and
+    # are all highlighted by a single query
+    deltas = [id for id, is_delta, snippet in rows if is_delta]
+    if len(deltas) > 0:
+        texts = [(post.id, revisions.text(post).content)
+                 for post in Post.query.filter(Post.id.in_(deltas))]
+        contents = text("unnest(:ids, :contents) AS texts(id, content)") \
+            .bindparams(ids=[id for id, content in texts],
+                        contents=[content for id, content in texts])
+        query = select([column("id"), headline(column("content"))]) \
+            .select_from(contents)
+        snippets.update(db.session.execute(query).fetchall())
+
+    return snippets
+
+
+def with_snippets(ids, fields, snippets):
+    """Serializes revisions with a snippet of their content instead of it."""
+    fields = [field for field in fields or DEFAULT_FIELDS
+              if field != "content"]
+
+    # Identifies the revisions, as those deleted since are skipped
+    posts = serialize_revisions(ids, fields + ["revision_id"])
+    for post in posts:
+        post["snippet"] = snippets.get(post["revision_id"])
+        if "revision_id" not in fields:
+            del post["revision_id"]
+
+    return posts
+
+
+def extract_results_posts(query, fields, key, results_per_page=None,
+                          facets_of=None, snippets_of=None):
+    def run():
+        results = query.all()
+        facets = count_facets(facets_of) if facets_of is not None else None
+        snippets = None
+        if snippets_of is not None:
+            snippets = make_snippets([result.id for result in results],
+                                     snippets_of)
+        return results, facets, snippets
+
+    results, facets, snippets = cached(key, run)
+    if results_per_page is not None:
+        results_per_page = int(results_per_page)
+    headers = next_cursor_headers(
+        results, results_per_page,
+        lambda result: (result.rank, result.created_at, result.id))
+    ids = [result.id for result in results]
+    if snippets is not None:
+        posts = with_snippets(ids, fields, snippets)
+    else:
+        posts = encode_revisions(ids, fields)
+    if facets is not None:
+        posts = with_facets(posts, facets)
+    return posts, 200, headers
 
 
 class PostSearchResource(Resource):
@@ -80,12 +225,40 @@ class PostSearchResource(Resource):
             in: query
             type: string
             required: false
+          - name: cursor
+            in: query
+            type: string
+            required: false
+            description: Opaque token from the X-Next-Cursor header of the
+              previous page. Takes precedence over `page`.
+          - name: fields
+            in: query
+            type: string
+            required: false
+            description: Comma separated list of the post fields to return.
+          - name: facets
+            in: query
+            type: boolean
+            required: false
+            description: Respond with an object holding the page of `posts`,
+              the `total` number of results, and their counts by tag and by
+              `is_guideline` under `facets`.
+          - name: snippets
+            in: query
+            type: boolean
+            required: false
+            description: Return a `snippet` of the content of each post, with
+              the matches highlighted in markdown, instead of the content.
         responses:
           200:
             schema:
               type: array
               items:
                 $ref: "#/definitions/Post"
+            headers:
+              X-Next-Cursor:
+                type: string
+                description: Cursor for the next page, if there is one.
         """
         if searched == "":
             return abort(400, message="Empty string search is invalid.")
@@ -95,22 +268,58 @@ class PostSearchResource(Resource):
         guidelines_only = request.args.get("guidelines_only")
         include_old = request.args.get("include_old")
         tag = request.args.get("tag")
+        cursor = request.args.get("cursor")
+        with_facet_counts = request.args.get("facets") == "true"
+        snippets = request.args.get("snippets") == "true"
+        fields = parse_fields()
 
         ts_query, ts_rank = construct_fulltext_query_and_rank(searched)
 
-        # Query for the search results ordered by rank
-        query = db.session.query(Post, ts_rank) \
-            .filter(Post.__ts_vector__.op('@@')(ts_query))
+        # Query for the search results ordered by rank. The rank is selected
+        # at double precision so that cursors built from it are exact.
+        query = db.session.query(
+            Post.id, Post.created_at,
+            cast(ts_rank, DOUBLE_PRECISION).label("rank")) \
+            .filter(Post.search_vector.op('@@')(ts_query))
         if (include_old != "true"):
             query = query.filter(Post.is_current)
         if guidelines_only == "true":
             query = query.filter(Post.is_guideline)
         if tag is not None:
             query = query.join(Post_Tag).join(Tag).filter(Tag.name == tag)
-        query = query.order_by(text("rank desc"), Post.created_at.desc())
+
+        # Facets are counted over all the results, whatever page is requested,
+        # but snippets are only made for the page returned
+        facets_of = query if with_facet_counts else None
+        snippets_of = ts_query if snippets else None
+
+        # Results are cached by what determines them, so that different
+        # spellings of the same query share them
+        key = (normalize(searched), include_old == "true",
+               guidelines_only == "true", tag, cursor, page,
+               results_per_page, with_facet_counts, snippets)
+
+        query = query.order_by(text("rank desc"), Post.created_at.desc(),
+                               Post.id.desc())
+
+        if cursor is not None:
+            query = after_cursor(query, ts_rank, cursor)
+            if results_per_page is None:
+                return extract_results_posts(query, fields, key,
+                                             facets_of=facets_of,
+                                             snippets_of=snippets_of)
+            if not results_per_page.isdigit():
+                return abort(400, message="results_per_page field must be "
+                             "a number.")
+            query = query.limit(int(results_per_page))
+            return extract_results_posts(query, fields, key,
+                                         results_per_page, facets_of,
+                                         snippets_of)
 
         if page is None or results_per_page is None:
-            return extract_results_posts(query)
+            return extract_results_posts(query, fields, key,
+                                         facets_of=facets_of,
+                                         snippets_of=snippets_of)
 
         if not page.isdigit() or not results_per_page.isdigit():
             return abort(400, message="Page and results_per_page fields must "
@@ -118,4 +327,105 @@ class PostSearchResource(Resource):
 
         query = limit_query(query, page, results_per_page)
 
-        return extract_results_posts(query)
+        return extract_results_posts(query, fields, key, results_per_page,
+                                     facets_of, snippets_of)
+
+
+# Default and largest number of suggestions returned
+SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+
+
+@swag.definition("Suggestion")
+def serialize_suggestion(suggestion):
+    """
+    Represents a completion of a search, either the title of a post or the
+    name of a tag.
+    ---
+    properties:
+      kind:
+        type: string
+        enum: [post, tag]
+      id:
+        type: integer
+        description: The id of the post or tag.
+      text:
+        type: string
+    """
+    return {
+        "kind": suggestion.kind,
+        "id": suggestion.id,
+        "text": suggestion.text,
+    }
+
+
+def escape_like(string):
+    return string.replace("\\", "\\\\").replace("%", "\\%") \
+        .replace("_", "\\_")
+
+
+def suggestion_candidates(kind, id, name, typed, *criteria):
+    """
+    Selects the texts that start with or are close to a word typed so far.
+    Both conditions are served by the trigram index on the texts.
+    """
+    prefix = name.ilike(escape_like(typed) + "%")
+    # The <% (word similarity) operator, with % escaped for psycopg2
+    similar = literal(typed).op("<%%")(name)
+    return select([
+        literal(kind).label("kind"), id.label("id"), name.label("text"),
+        prefix.label("prefix"),
+        func.word_similarity(typed, name).label("similarity"),
+    ]).where(and_(or_(prefix, similar), *criteria))
+
+
+class SearchSuggestResource(Resource):
+
+    def get(self):
+        """
+        Suggests completions of a search being typed, from the titles of
+        current posts and the names of tags. Texts starting with the typed
+        string come first, followed by those containing a close match.
+        ---
+        parameters:
+          - name: q
+            in: query
+            type: string
+            required: true
+            description: The search typed so far.
+          - name: limit
+            in: query
+            type: integer
+            required: false
+            description: The number of suggestions, at most 50. Defaults to
+              10.
+        responses:
+          200:
+            schema:
+              type: array
+              items:
+                $ref: "#/definitions/Suggestion"
+        """
+        typed = (request.args.get("q") or "").strip()
+        limit = request.args.get("limit", str(SUGGESTIONS))
+
+        if typed == "":
+            return abort(400, message="`q` must not be empty.")
+
+        if not limit.isdigit() or not 0 < int(limit) <= MAX_SUGGESTIONS:
+            return abort(400, message="`limit` must be a number between 1 "
+                         f"and {MAX_SUGGESTIONS}.")
+
+        candidates = union_all(
+            suggestion_candidates("post", Post.post_id, Post.title, typed,
+                                  Post.is_current),
+            suggestion_candidates("tag", Tag.id, Tag.name, typed)
+        ).alias("candidates")
+
+        suggestions = db.session.query(candidates) \
+            .order_by(candidates.c.prefix.desc(),
+                      candidates.c.similarity.desc(),
+                      func.length(candidates.c.text), candidates.c.text) \
+            .limit(int(limit))
+
+        return [serialize_suggestion(s) for s in suggestions]
@@ -0,0 +1,95 @@
+"""
+Serialization of posts to json inside Postgres.
+
+Builds the same bytes as encoding the dicts of `serialize_post` with
+`drp.encoding.dumps`, without loading any ORM objects: Postgres escapes
+strings exactly as orjson does, keys are emitted in the same order, and tags
+and files are aggregated in the order of the `Post` relationships.
+
+Postgres cannot rebuild revisions stored as deltas, so those are reported
+for the caller to serialize itself.
+"""
+from sqlalchemy import select, literal_column
+from sqlalchemy.dialects.postgresql import TEXT, aggregate_order_by
+from sqlalchemy.sql import func
+from sqlalchemy.sql.expression import case, cast
+
+from ..db import db
+from ..models import Post, Post_Tag, Tag, File
+
+
+def json_value(expression):
+    """Encodes a string, number or boolean, or null."""
+    return func.coalesce(cast(func.to_json(expression), TEXT), "null")
+
+
+def json_timestamp(expression):
+    """Encodes a timestamp in UTC like datetime.isoformat."""
+    utc = func.timezone("UTC", expression)
+    fraction = case(
+        [(func.date_trunc("second", expression) != expression,
+          func.to_char(utc, ".US"))], else_="")
+    return func.concat('"', func.to_char(utc, 'YYYY-MM-DD"T"HH24:MI:SS'),
+                       fraction, '+00:00"')
+
+
+def json_array(element, order_by):
+    separator = aggregate_order_by(literal_column("','"), order_by)
+    return func.concat("[", func.string_agg(element, separator), "]")
+
+
+def json_object(members):
+    """Encodes (key, encoded value) pairs as an object, keeping the order."""
+    parts = []
+    for key, value in members:
+        parts += ["," if len(parts) > 0 else "", f'"{key}":', value]
+    return func.concat("{", *parts, "}")
+
+
+def tags_json():
+    tag = json_object([("id", cast(Tag.id, TEXT)),
+                       ("name", json_value(Tag.name))])
+    return select([json_array(tag, Tag.id)]) \
+        .select_from(Post_Tag.__table__.join(Tag.__table__)) \
+        .where(Post_Tag.post_id == Post.id).as_scalar()
+
+
+def files_json():
+    file = json_object([("id", cast(File.id, TEXT)),
+                        ("name", json_value(File.name)),
+                        ("post", json_value(File.post_id))])
+    return select([json_array(file, File.id)]) \
+        .where(File.post_id == Post.id).as_scalar()
+
+
+# Encoded value of each field of a serialized post
+FIELDS = {
+    "id": lambda: json_value(Post.post_id),
+    "title": lambda: json_value(Post.title),
+    "summary": lambda: json_value(Post.summary),
+    "content": lambda: json_value(Post.content),
+    "is_guideline": lambda: json_value(Post.is_guideline),
+    "is_current": lambda: json_value(Post.is_current),
+    "revision_id": lambda: cast(Post.id, TEXT),
+    "created_at": lambda: json_timestamp(Post.created_at),
+    "tags": tags_json,
+    "files": files_json,
+    "content_html": lambda: json_value(Post.content_html),
+}
+
+
+def select_posts(ids, fields):
+    """
+    Encodes the revisions with the given ids. Returns a dictionary from
+    revision id to the encoded revision, or None for revisions stored as
+    deltas.
+    """
+    if len(ids) == 0:
+        return {}
+
+    encoded = json_object([(field, FIELDS[field]()) for field in fields])
+    rows = db.session.query(Post.id, Post.delta.isnot(None), encoded) \
+        .filter(Post.id.in_(ids))
+
+    return {id: None if is_delta else text.encode("utf-8")
+            for id, is_delta, text in rows}
@@ -3,6 +3,7 @@ from flask_restful import Resource, abort
 
 from sqlalchemy.exc import IntegrityError
 
+from .. import cache, changes
 from ..db import db
 from ..models import Tag
 from ..swag import swag
@@ -61,6 +62,7 @@ class TagResource(Resource):
 
         if name is not None:
             tag.name = name
+            changes.record_tag_change(tag)
 
         try:
             db.session.commit()
@@ -71,6 +73,9 @@ class TagResource(Resource):
             else:
                 raise
 
+        # Tag names are embedded in serialized posts
+        cache.invalidate_posts()
+
         return serialize_tag(tag)
 
     def delete(self, id):
@@ -93,9 +98,13 @@ class TagResource(Resource):
         if tag is None:
             return abort(404)
 
+        changes.record_tag_change(tag)
+
         db.session.delete(tag)
         db.session.commit()
 
+        cache.invalidate_posts()
+
         return '', 204
 
 
@@ -1,5 +1,6 @@
 from functools import wraps
-from flask import request, g
+from hashlib import sha1
+from flask import request, g, Response
 
 from ..models import User, UserRole
 from ..utils import decode_authorization_header
@@ -17,6 +18,32 @@ def error(code: int, message: str = None, type: str = None):
     return body, code, {"Content-Type": "application/json"}
 
 
+def make_etag(*parts):
+    """
+    Builds a strong entity tag from the given parts together with the
+    request path and query parameters.
+    """
+    args = sorted(request.args.items(multi=True))
+    data = repr((request.path, args) + parts).encode("utf-8")
+    return sha1(data).hexdigest()
+
+
+def not_modified(etag):
+    """
+    Returns an empty 304 response if the client already holds the entity
+    identified by `etag`, or None if the full response should be sent.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        # Repeats the validator the client holds, which is weak if the full
+        # response was compressed, see compression.mark_encoded
+        response.set_etag(etag,
+                          weak=not request.if_none_match.is_strong(etag))
+        return response
+
+    return None
+
+
 def require_auth(f):
     @wraps(f)
     def decorated_f(*args, **kwargs):
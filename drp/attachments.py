@@ -0,0 +1,81 @@
+"""
+Removal of uploaded files from the upload folder.
+
+Deleting a file only records a tombstone in the same transaction as the
+deletion of its database record. The files are removed afterwards by
+`collect`, in batches, outside of the request.
+"""
+import os
+
+from flask import current_app
+
+from .db import db
+from .models import FileTombstone
+from .tasks import tasks
+
+
+# Number of times removing a file is attempted before giving up
+MAX_ATTEMPTS = 5
+
+
+def discard(file):
+    """Deletes a file record, leaving a tombstone for the file on disk."""
+    db.session.add(FileTombstone(filename=file.filename))
+    db.session.delete(file)
+
+
+def schedule():
+    """Starts collecting tombstoned files in background."""
+    tasks.submit(collect)
+
+
+def collect(batch_size=100, progress=None):
+    """
+    Removes the files of pending tombstones, committing after each batch.
+    Files that cannot be removed are retried on later runs, up to
+    MAX_ATTEMPTS times. `progress` is called with the number of files
+    removed and failed so far after each batch.
+
+    Concurrent collectors skip the tombstones locked by each other.
+    """
+    folder = current_app.config["UPLOAD_FOLDER"]
+
+    removed = 0
+    failed = 0
+    last_id = 0
+
+    while True:
+        batch = FileTombstone.query \
+            .filter((FileTombstone.id > last_id)
+                    & (FileTombstone.attempts < MAX_ATTEMPTS)) \
+            .order_by(FileTombstone.id).limit(batch_size) \
+            .with_for_update(skip_locked=True).all()
+
+        if len(batch) == 0:
+            break
+
+        for tombstone in batch:
+            try:
+                os.remove(os.path.join(folder, tombstone.filename))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                tombstone.attempts += 1
+                tombstone.error = repr(e)
+                failed += 1
+                continue
+
+            db.session.delete(tombstone)
+            removed += 1
+
+        last_id = batch[-1].id
+        db.session.commit()
+
+        if progress is not None:
+            progress(removed, failed)
+
+    if removed > 0 or failed > 0:
+        current_app.logger.info(
+            f"Collected {removed} files, failed to remove {failed}")
+
+    return removed, failed
@@ -0,0 +1,201 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A thread safe mapping holding at most `maxsize` entries. When full, the
+    least recently used entry is evicted to make room for a new one. A
+    `maxsize` of 0 disables the cache.
+    """
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.collapsed = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Entries being built by get_or_set, and a count of clears so that
+        # entries built from data read before a clear are not stored
+        self._building = {}
+        self._generation = 0
+
+    def get(self, key, default=None, valid=None):
+        """
+        Looks up an entry. If `valid` is given, entries for which it returns
+        False are treated as stale: they are dropped and count as a miss.
+        """
+        with self._lock:
+            if key not in self._entries or \
+                    (valid is not None and not valid(self._entries[key])):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def peek(self, key, default=None):
+        """Looks up an entry without counting the lookup or using it."""
+        with self._lock:
+            return self._entries.get(key, default)
+
+    def get_or_set(self, key, build):
+        """
+        Looks up an entry, building and storing it with `build` on a miss.
+        Concurrent misses for the same key wait for the first one to build
+        the entry instead of building it again. An entry is not stored if
+        the cache is cleared while it is being built, as it may be stale.
+        """
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+
+                building = self._building.get(key)
+                if building is None:
+                    building = self._building[key] = _Building()
+                    generation = self._generation
+                    self.misses += 1
+                    break
+
+                self.collapsed += 1
+
+            building.done.wait()
+            if building.succeeded:
+                return building.value
+            # The build failed, so it is attempted again
+
+        try:
+            building.value = build()
+            building.succeeded = True
+        finally:
+            with self._lock:
+                del self._building[key]
+                if building.succeeded and generation == self._generation \
+                        and self.maxsize > 0:
+                    self._entries[key] = building.value
+                    self._entries.move_to_end(key)
+                    self._evict()
+            building.done.set()
+
+        return building.value
+
+    def set(self, key, value):
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate):
+        """Removes every entry whose key satisfies the predicate."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "collapsed": self.collapsed,
+                "hit_rate": self.hits / lookups if lookups > 0 else None,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        while len(self._entries) > max(self.maxsize, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+class _Building:
+    def __init__(self):
+        self.done = threading.Event()
+        self.succeeded = False
+        self.value = None
+
+
+caches = {}
+
+
+def register(name, maxsize):
+    """
+    Creates a named cache. Its size can be overridden with the
+    `<NAME>_CACHE_SIZE` config option.
+    """
+    cache = LRUCache(name, maxsize)
+    caches[name] = cache
+    return cache
+
+
+def clear_all():
+    for cache in caches.values():
+        cache.clear()
+
+
+def init_app(app):
+    for name, cache in caches.items():
+        size = app.config.get(f"{name.upper()}_CACHE_SIZE")
+        if size is not None:
+            cache.resize(int(size))
+
+
+# Serialized responses of the post endpoints, keyed by ("list", args) for
+# listings and ("post", post_id, args) for single posts
+responses = register("responses", 256)
+
+# Encoded diffs between two revisions, keyed by (post_id, from, to). Revisions
+# never change, so entries only need checking for deleted revisions.
+diffs = register("diffs", 256)
+
+
+# Functions called by `invalidate_posts` with the same argument, for other
+# in-memory copies of posts to follow the writes made by this process
+invalidation_listeners = []
+
+
+def invalidate_posts(post_id=None):
+    """
+    Drops cached responses derived from the post with the given id and from
+    post listings. If no id is given, every cached post response is dropped.
+    """
+    for listener in invalidation_listeners:
+        listener(post_id)
+
+    if post_id is None:
+        responses.clear()
+        return
+
+    post_id = int(post_id)
+    responses.discard_where(
+        lambda key: key[0] == "list" or key[:2] == ("post", post_id))
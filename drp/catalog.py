@@ -0,0 +1,213 @@
+"""
+In-memory catalog of the current revision of every post.
+
+When enabled with the `CATALOG_ENABLED` config option, each server process
+keeps the serialized current posts, with their tags and files, in memory and
+serves reads of current posts from there without querying the database.
+
+Writes are followed through the post change log. Committing entries to the
+log notifies the `post_changes` channel, which a background thread listens
+to. Once notified, the catalog reads the new log entries and reloads the
+posts they name before serving the next request. If the listener is not
+connected, the catalog is resynchronised at least every `CATALOG_MAX_AGE`
+seconds instead.
+"""
+import select
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+
+from . import cache, changes
+from .db import db
+
+
+CHANNEL = "post_changes"
+
+CatalogEntry = namedtuple("CatalogEntry", [
+    "post_id", "revision_id", "created_at", "is_guideline", "tags", "data"])
+
+
+class Snapshot:
+    """A consistent view of the catalog at a point in the change log."""
+
+    def __init__(self, entries, version):
+        self.entries = entries
+        self.version = version
+        # Newest first, in the order of post listings
+        self.ordered = sorted(entries.values(), reverse=True,
+                              key=lambda e: (e.created_at, e.revision_id))
+
+    def get(self, post_id):
+        return self.entries.get(post_id)
+
+
+class Catalog:
+
+    def __init__(self):
+        self._snapshot = None
+        self._follower = changes.LogFollower()
+        self._lock = threading.Lock()
+        self._pending_since = None
+        self._synced_at = None
+        self._listener = None
+        self._listening = False
+
+    def init_app(self, app):
+        app.config.setdefault("CATALOG_ENABLED", False)
+        app.config.setdefault("CATALOG_LISTEN", True)
+        app.config.setdefault("CATALOG_MAX_AGE", 60)
+
+        cache.invalidation_listeners.append(self.changed)
+
+    def enabled(self):
+        return current_app.config["CATALOG_ENABLED"]
+
+    def changed(self, post_id=None):
+        """Marks the catalog as out of date, until it is synchronised."""
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self._snapshot = None
+            self._follower.reset()
+            self._pending_since = None
+            self._synced_at = None
+
+    def snapshot(self):
+        """
+        Returns an up to date snapshot of the catalog, or None if it is
+        disabled.
+        """
+        if not self.enabled():
+            return None
+
+        app = current_app._get_current_object()
+        if app.config["CATALOG_LISTEN"]:
+            self._start_listener(app)
+
+        with self._lock:
+            if self._snapshot is None:
+                self._load()
+            elif self._pending_since is not None or (
+                    not self._listening and time.monotonic() - self._synced_at
+                    >= app.config["CATALOG_MAX_AGE"]):
+                self._sync()
+
+            return self._snapshot
+
+    def _load(self):
+        self._pending_since = None
+        self._follower.reset()
+        self._follower.read()
+
+        entries = {entry.post_id: entry for entry in load_entries()}
+
+        self._snapshot = Snapshot(entries, self._follower.head)
+        self._synced_at = time.monotonic()
+
+    def _sync(self):
+        # Notifications arriving from now on mark the catalog out of date
+        # again, even if they are for entries read below
+        self._pending_since = None
+
+        log = self._follower.read()
+        post_ids = {entry.post_id for entry in log}
+
+        if len(post_ids) > 0:
+            entries = dict(self._snapshot.entries)
+            for post_id in post_ids:
+                entries.pop(post_id, None)
+            for entry in load_entries(post_ids):
+                entries[entry.post_id] = entry
+
+            self._snapshot = Snapshot(entries, self._follower.head)
+
+        self._synced_at = time.monotonic()
+
+    def _start_listener(self, app):
+        # Started lazily so that each forked server worker gets its own
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, args=(app,), daemon=True,
+                    name="catalog-listener")
+                self._listener.start()
+
+    def _listen(self, app):
+        while True:
+            try:
+                with app.app_context():
+                    connection = db.engine.raw_connection()
+                # Keep the connection out of the pool for good
+                connection.detach()
+                self._receive(connection.connection)
+            except Exception:
+                app.logger.exception("Catalog listener disconnected")
+            finally:
+                self._listening = False
+
+            time.sleep(5)
+
+    def _receive(self, connection):
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+
+        self._listening = True
+        # Writes made while disconnected were missed
+        self.changed()
+
+        while True:
+            if select.select([connection], [], [], 60) == ([], [], []):
+                continue
+
+            connection.poll()
+            if len(connection.notifies) > 0:
+                del connection.notifies[:]
+                self.changed()
+
+    def stats(self):
+        now = time.monotonic()
+        pending_since = self._pending_since
+        snapshot = self._snapshot
+
+        if not self._listening and self._synced_at is not None:
+            # Without notifications, writes may have been missed since the
+            # last synchronisation
+            stale_since = self._synced_at
+        else:
+            stale_since = pending_since
+
+        return {
+            "loaded": snapshot is not None,
+            "posts": len(snapshot.entries) if snapshot is not None else 0,
+            "version": snapshot.version if snapshot is not None else None,
+            "listening": self._listening,
+            "staleness": now - stale_since if stale_since is not None else 0,
+        }
+
+
+def load_entries(post_ids=None):
+    """
+    Loads the catalog entries of the current posts with the given ids, or of
+    every current post.
+    """
+    from .api.posts import POST_FIELDS, current_posts, serialize_post, \
+        with_relations
+    from .models import CurrentPost
+
+    query = current_posts()
+    if post_ids is not None:
+        query = query.filter(CurrentPost.post_id.in_(post_ids))
+
+    fields = list(POST_FIELDS)
+    return [CatalogEntry(post.post_id, post.id, post.created_at,
+                         post.is_guideline, {tag.name for tag in post.tags},
+                         serialize_post(post, fields))
+            for post in with_relations(query, fields)]
+
+
+catalog = Catalog()
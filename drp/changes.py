@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import select, literal, cast
+from sqlalchemy.sql import func
+
+from .db import db
+from .models import ChangeKind, Post, Post_Tag, PostChange
+
+
+# Key of the advisory lock serializing writes to the change log
+LOG_LOCK = 7316001
+
+
+def lock():
+    """
+    Holds the lock serializing writes to the change log until the current
+    transaction ends. Entries are numbered when written but only become
+    visible on commit, so without it a reader could move past an entry that
+    is committed after a newer one, and never see it.
+    """
+    db.session.execute(select([func.pg_advisory_xact_lock(LOG_LOCK)]))
+
+
+def record(kind, revision=None, post_id=None):
+    """
+    Adds an entry to the post change log in the current transaction. The
+    post id is taken from the revision if one is given.
+    """
+    revision_id = None
+
+    # Taken before any row is written, to keep a consistent lock order
+    lock()
+
+    if revision is not None:
+        if revision.id is None or revision.post_id is None:
+            # New revisions are only assigned their ids when inserted
+            db.session.flush()
+        revision_id = revision.id
+        post_id = revision.post_id
+
+    db.session.add(PostChange(kind=kind, post_id=post_id,
+                              revision_id=revision_id))
+
+
+def record_tag_change(tag):
+    """Logs an update of every revision carrying the given tag."""
+    kind = cast(literal(ChangeKind.UPDATED.name), PostChange.kind.type)
+    revisions = select([kind, Post.post_id, Post.id]) \
+        .select_from(Post.__table__.join(Post_Tag.__table__)) \
+        .where(Post_Tag.tag_id == tag.id)
+
+    lock()
+    db.session.execute(PostChange.__table__.insert().from_select(
+        ["kind", "post_id", "revision_id"], revisions))
+
+
+# Log entries are numbered when they are written but become visible when
+# their transaction commits. `lock` keeps those in the same order, but as a
+# safeguard against writers bypassing it (e.g. manual fixes in SQL), entries
+# logged in the last SYNC_GRACE seconds are read again by every
+# LogFollower.read.
+SYNC_GRACE = 30
+
+
+class LogFollower:
+    """
+    Tracks the position of a consumer of the change log within the current
+    process, e.g. a cache of post data that must follow writes made by other
+    processes.
+    """
+
+    def __init__(self):
+        self._heads = deque()
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._heads.clear()
+
+    def _since(self, now):
+        with self._lock:
+            # Keep the newest head older than the grace period, or the
+            # oldest one if none is yet
+            while len(self._heads) > 1 \
+                    and self._heads[1][0] <= now - SYNC_GRACE:
+                self._heads.popleft()
+
+            if len(self._heads) == 0:
+                return None
+            return self._heads[0][1]
+
+    @property
+    def head(self):
+        """The id of the newest entry read, or None before the first read."""
+        with self._lock:
+            return self._heads[-1][1] if len(self._heads) > 0 else None
+
+    def read(self):
+        """
+        Returns the entries logged since the previous call. The first call
+        only records the current position, and returns None.
+        """
+        now = time.monotonic()
+        since = self._since(now)
+
+        if since is None:
+            entries = None
+            head = db.session.query(func.max(PostChange.id)).scalar() or 0
+        else:
+            entries = db.session.query(PostChange.id, PostChange.post_id,
+                                       PostChange.revision_id) \
+                .filter(PostChange.id > since).all()
+            head = max([since] + [entry.id for entry in entries])
+
+        with self._lock:
+            # A head is recorded with the time it was first seen
+            if len(self._heads) == 0 or self._heads[-1][1] != head:
+                self._heads.append((now, head))
+
+        return entries
@@ -2,9 +2,13 @@ import click
 import json
 import flask_migrate
 from flask.cli import with_appcontext
+from sqlalchemy.sql import func
 
+from . import attachments, notifications, revisions, search
 from .db import db
-from .models import Tag, Post, Site, Subject, Grade, Question, User, UserRole
+from .models import (Tag, Post, Site, Subject, Grade, Question, User, UserRole,
+                     Notification, NotificationStatus)
+from .rendering import render_content
 
 
 @click.command("seed", help="Seed the database with data from a json file.")
@@ -33,7 +37,9 @@ def seed(filename, drop_all):
                 tags = [Tag.query.filter(Tag.name == tag).one()
                         for tag in post["tags"]]
             return Post(title=post.get("title"), summary=post.get("summary"),
-                        content=post.get("content"), tags=tags)
+                        content=post.get("content"),
+                        content_html=render_content(post.get("content")),
+                        tags=tags)
 
         posts = map(create_post, posts)
         db.session.add_all(posts)
@@ -96,3 +102,84 @@ def delete_user(email):
     else:
         db.session.delete(user)
         db.session.commit()
+
+
+@click.command("render-posts",
+               help="Render the html of posts created before it was stored.")
+@click.option("--batch-size", default=100, show_default=True)
+@with_appcontext
+def render_posts(batch_size):
+    rendered = 0
+    while True:
+        posts = Post.query \
+            .filter(Post.content_html.is_(None) & Post.content.isnot(None)) \
+            .order_by(Post.id).limit(batch_size).all()
+
+        if len(posts) == 0:
+            break
+
+        for post in posts:
+            post.content_html = render_content(post.content)
+
+        db.session.commit()
+
+        rendered += len(posts)
+        print(f"Rendered {rendered} posts")
+
+
+@click.command("send-notifications",
+               help="Deliver push notifications that are still pending.")
+@with_appcontext
+def send_notifications():
+    pending = Notification.query \
+        .filter(Notification.status == NotificationStatus.PENDING) \
+        .order_by(Notification.id).all()
+
+    for notification in pending:
+        notifications.deliver(notification.id)
+        print(notification)
+
+
+@click.command("compact-revisions",
+               help="Store old revisions of posts as deltas.")
+@click.option("--expand", default=False, is_flag=True,
+              help="Store all revisions in full again instead.")
+@with_appcontext
+def compact_revisions(expand):
+    post_ids = [post_id for post_id, in db.session.query(Post.post_id)
+                .group_by(Post.post_id).having(func.count(Post.id) > 1)
+                .order_by(Post.post_id)]
+
+    for post_id in post_ids:
+        if expand:
+            for revision in Post.query.filter(Post.post_id == post_id).all():
+                revisions.expand(revision)
+            print(f"Expanded post {post_id}")
+        else:
+            compacted = revisions.compact_history(post_id)
+            print(f"Compacted {compacted} revisions of post {post_id}")
+
+        # Commit per post to keep transactions short
+        db.session.commit()
+
+
+@click.command("collect-files",
+               help="Remove the files of deleted attachments from disk.")
+@click.option("--batch-size", default=100, show_default=True)
+@with_appcontext
+def collect_files(batch_size):
+    def progress(removed, failed):
+        print(f"Removed {removed} files, failed to remove {failed}")
+
+    attachments.collect(batch_size, progress)
+
+
+@click.command("rebuild-search-vectors",
+               help="Recompute the text search vectors of all revisions.")
+@click.option("--batch-size", default=500, show_default=True)
+@with_appcontext
+def rebuild_search_vectors(batch_size):
+    def progress(updated):
+        print(f"Rebuilt {updated} revisions")
+
+    search.rebuild(batch_size, progress)
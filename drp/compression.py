@@ -0,0 +1,105 @@
+import gzip
+import threading
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def available_encodings():
+    """Content codings supported by the server, most preferred first."""
+    if brotli is not None:
+        return ["br", "gzip"]
+    return ["gzip"]
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def negotiate():
+    """
+    Picks the content coding to use for the current request, or None if the
+    client does not accept any of the supported codings.
+    """
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def should_compress(response):
+    return response.status_code == 200 \
+        and not response.direct_passthrough \
+        and "Content-Encoding" not in response.headers \
+        and response.mimetype == "application/json" \
+        and response.content_length is not None \
+        and response.content_length >= \
+        current_app.config["COMPRESS_MIN_SIZE"]
+
+
+def mark_encoded(response, encoding):
+    response.headers["Content-Encoding"] = encoding
+
+    # The compressed body is a different representation, so a strong
+    # validator of the uncompressed body no longer applies byte for byte
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def compress_response(response):
+    if not should_compress(response):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    encoding = negotiate()
+    if encoding is None:
+        return response
+
+    response.set_data(compress(response.get_data(), encoding))
+    mark_encoded(response, encoding)
+
+    return response
+
+
+class PrecompressedBody:
+    """
+    An encoded response body that keeps its compressed variants, so that a
+    body served many times from a cache is only compressed once per coding.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def variant(self, encoding):
+        with self._lock:
+            if encoding not in self._variants:
+                self._variants[encoding] = compress(self.data, encoding)
+            return self._variants[encoding]
+
+    def apply(self, response):
+        """Sets the body of the response, compressed if negotiated."""
+        response.set_data(self.data)
+
+        if not should_compress(response):
+            return response
+
+        response.vary.add("Accept-Encoding")
+
+        encoding = negotiate()
+        if encoding is not None:
+            response.set_data(self.variant(encoding))
+            mark_encoded(response, encoding)
+
+        return response
+
+
+def init_app(app):
+    app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+    app.after_request(compress_response)
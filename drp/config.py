@@ -34,3 +34,30 @@ MAIL_SERVER = os.environ.get("MAIL_SERVER")
 MAIL_USERNAME = os.environ.get("MAIL_USERNAME")
 MAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
 MAIL_DEFAULT_SENDER = os.environ.get("MAIL_DEFAULT_SENDER")
+
+RESPONSES_CACHE_SIZE = int(os.environ.get("RESPONSES_CACHE_SIZE", 256))
+
+# Number of old revisions whose rebuilt text is kept in memory
+HISTORY_CACHE_SIZE = int(os.environ.get("HISTORY_CACHE_SIZE", 512))
+
+DIFFS_CACHE_SIZE = int(os.environ.get("DIFFS_CACHE_SIZE", 256))
+
+# Number of serialized revisions kept in memory
+FRAGMENTS_CACHE_SIZE = int(os.environ.get("FRAGMENTS_CACHE_SIZE", 1024))
+
+# Number of search results and normalized search queries kept in memory
+SEARCHES_CACHE_SIZE = int(os.environ.get("SEARCHES_CACHE_SIZE", 256))
+SEARCH_QUERIES_CACHE_SIZE = int(
+    os.environ.get("SEARCH_QUERIES_CACHE_SIZE", 1024))
+
+# Whether current posts are served from memory, see drp.catalog
+CATALOG_ENABLED = os.environ.get("CATALOG_ENABLED") == "true"
+
+# Whether post lists are encoded to json by the database, see drp.api.sql_json
+SQL_JSON = os.environ.get("SQL_JSON") == "true"
+
+# Whether superseded guideline revisions are stored as deltas
+COMPACT_REVISIONS = os.environ.get("COMPACT_REVISIONS", "true") == "true"
+
+# Smallest json response body, in bytes, that is compressed
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
@@ -1,5 +1,24 @@
+from flask import g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    # Queries issued outside of a request (cli commands, background work)
+    # are not attributed to anything
+    if has_request_context():
+        g.query_count = g.get("query_count", 0) + 1
+
+
+def query_count():
+    """Returns the number of queries issued so far by the current request."""
+    return g.get("query_count", 0)
 
 
 class Database(SQLAlchemy):
@@ -11,5 +30,13 @@ class Database(SQLAlchemy):
         super().init_app(app)
         self.migrate.init_app(app, self)
 
+        app.config.setdefault("REPORT_QUERY_COUNT", True)
+
+        @app.after_request
+        def report_query_count(response):
+            if app.config["REPORT_QUERY_COUNT"]:
+                response.headers[QUERY_COUNT_HEADER] = str(query_count())
+            return response
+
 
 db = Database()
@@ -0,0 +1,72 @@
+import json
+from datetime import date, datetime, time
+
+from flask import make_response
+from flask.json import JSONEncoder as FlaskJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, (date, datetime, time)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} "
+                    "is not JSON serializable")
+
+
+class Encoded(bytes):
+    """JSON that is already encoded, which `dumps` outputs unchanged."""
+
+
+def dumps(data):
+    """
+    Encodes data as compact UTF-8 JSON, using orjson if it is installed.
+    Datetimes are encoded in ISO 8601 format.
+
+    The fallback produces the same output as orjson for the types used by
+    the api serializers.
+    """
+    if isinstance(data, Encoded):
+        return bytes(data)
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            # e.g. dictionaries with non-string keys
+            pass
+
+    return json.dumps(data, default=_default, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def output_json(data, code, headers=None):
+    """flask_restful representation for application/json responses."""
+    response = make_response(dumps(data), code)
+    response.headers.extend(headers or {})
+    return response
+
+
+class JSONEncoder(FlaskJSONEncoder):
+    """
+    Flask json encoder used by `jsonify`, delegating to orjson when it is
+    installed. Pretty printing and non-native types keep the behaviour of
+    the default Flask encoder.
+    """
+
+    def encode(self, o):
+        if orjson is None or self.indent is not None:
+            return super().encode(o)
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+
+        try:
+            return orjson.dumps(o, default=self.default,
+                                option=option).decode("utf-8")
+        except orjson.JSONEncodeError:
+            return super().encode(o)
@@ -0,0 +1,53 @@
+"""
+Cache of serialized post revisions, shared by every endpoint returning posts.
+
+The serialization of a revision only changes when its tags, files or current
+flag do, and every such write is recorded in the post change log. Before the
+cache is used, the entries logged since it was last synchronised are read and
+the fragments of the revisions they name are dropped. This keeps the cache of
+each server process consistent with writes made by the others.
+"""
+from . import cache, changes
+
+
+# Serialized revisions, keyed by revision id
+fragments = cache.register("fragments", 1024)
+
+follower = changes.LogFollower()
+
+
+def sync():
+    """Drops the fragments of revisions changed since the last call."""
+    # Nothing is cached before the first call, which returns no entries
+    for entry in follower.read() or []:
+        if entry.revision_id is not None:
+            fragments.discard(entry.revision_id)
+
+
+def get(revision_id, fields):
+    """Returns the cached fragment of a revision if it has all `fields`."""
+    fragment = fragments.get(revision_id)
+
+    if fragment is None or any(field not in fragment for field in fields):
+        return None
+
+    return fragment
+
+
+def put(revision_id, fragment):
+    """
+    Caches some fields of a revision, along with those already cached.
+    Returns the fragment holding all of them.
+    """
+    cached = fragments.peek(revision_id)
+    if cached is not None:
+        fragment = dict(cached, **fragment)
+
+    fragments.set(revision_id, fragment)
+    return fragment
+
+
+def reset():
+    """Empties the cache, e.g. once the change log has been recreated."""
+    fragments.clear()
+    follower.reset()
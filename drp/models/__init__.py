@@ -1,8 +1,13 @@
 from .question import Question, Site, Subject, Grade
-from .post import Post, Tag, File, Post_Tag
+from .post import Post, CurrentPost, Tag, File, Post_Tag
+from .change import PostChange, ChangeKind
 from .device import Device
+from .notification import Notification, NotificationStatus
+from .tombstone import FileTombstone
 from .user import User, UserRole
 
-__all__ = ["Post", "Tag", "File", "Post_Tag", "Question",
-           "Site", "Subject", "Grade", "Device",
+__all__ = ["Post", "CurrentPost", "Tag", "File", "Post_Tag",
+           "PostChange", "ChangeKind",
+           "Question", "Site", "Subject", "Grade", "Device",
+           "Notification", "NotificationStatus", "FileTombstone",
            "User", "UserRole"]
@@ -0,0 +1,54 @@
+import enum
+
+from sqlalchemy import event
+from sqlalchemy.schema import DDL
+from sqlalchemy.sql import func
+
+from ..db import db
+
+
+class ChangeKind(enum.Enum):
+    CREATED = 1
+    UPDATED = 2
+    SUPERSEDED = 3
+    REVISION_DELETED = 4
+    DELETED = 5
+
+
+class PostChange(db.Model):
+    """
+    An entry in the log of writes to posts, used to let clients synchronise
+    incrementally. Revision and post ids are not foreign keys, since entries
+    outlive the revisions they refer to.
+    """
+    __tablename__ = "post_changes"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.Enum(ChangeKind), nullable=False)
+    post_id = db.Column(db.Integer, nullable=False)
+    revision_id = db.Column(db.Integer)
+
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           server_default=func.now())
+
+    def __repr__(self):
+        return f"<PostChange {self.kind.name} {self.revision_id}>"
+
+
+# Notifies listeners on the post_changes channel when new entries are
+# committed, see drp.catalog
+NOTIFY_POST_CHANGES = """
+CREATE OR REPLACE FUNCTION notify_post_changes() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('post_changes', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER notify_post_changes
+AFTER INSERT ON post_changes
+FOR EACH STATEMENT EXECUTE PROCEDURE notify_post_changes();
+"""
+
+event.listen(PostChange.__table__, "after_create",
+             DDL(NOTIFY_POST_CHANGES).execute_if(dialect="postgresql"))
@@ -0,0 +1,46 @@
+import enum
+
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from ..db import db
+
+
+class NotificationStatus(enum.Enum):
+    PENDING = 1
+    SENT = 2
+    FAILED = 3
+
+
+class Notification(db.Model):
+    """
+    A push notification queued for delivery, either to every registered
+    device or to the devices of a single user.
+    """
+    __tablename__ = "notifications"
+
+    id = db.Column(db.Integer, primary_key=True)
+    broadcast = db.Column(db.Boolean, nullable=False, default=False)
+    user_id = db.Column(db.Integer, db.ForeignKey(
+        "users.id", name="notifications_user_id_fkey", ondelete="SET NULL"))
+    title = db.Column(db.Text, nullable=False)
+    body = db.Column(db.Text)
+    data = db.Column(db.JSON)
+
+    status = db.Column(db.Enum(NotificationStatus), nullable=False,
+                       default=NotificationStatus.PENDING)
+    attempts = db.Column(db.Integer, nullable=False, server_default="0",
+                         default=0)
+    # Number of devices expo accepted and rejected the notification for
+    delivered = db.Column(db.Integer)
+    rejected = db.Column(db.Integer)
+    error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           server_default=func.now())
+    sent_at = db.Column(db.DateTime(timezone=True))
+
+    user = relationship("User")
+
+    def __repr__(self):
+        return f"<Notification '{self.title}' {self.status.name}>"
@@ -1,20 +1,16 @@
-from sqlalchemy.schema import Sequence
+from sqlalchemy import event
+from sqlalchemy.schema import Sequence, DDL
 from sqlalchemy.sql import func
-from sqlalchemy.sql.expression import cast
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.dialects import postgresql
 
 from ..db import db
 
 
-def create_tsvector(*components):
-    """Creates a postgresql text search vector from the provided components."""
-    coalesced = list(
-        map(lambda c: cast(func.coalesce(c, ''), postgresql.TEXT), components))
-    expression = coalesced[0]
-    for e in coalesced[1:]:
-        expression += ' ' + e
-    return func.to_tsvector('english', expression)
+# Trigram indexes need the pg_trgm extension
+event.listen(db.Model.metadata, "before_create",
+             DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+             .execute_if(dialect="postgresql"))
 
 
 class Post(db.Model):
@@ -26,28 +22,39 @@ class Post(db.Model):
     title = db.Column(db.String(120), nullable=False)
     summary = db.Column(db.String(200))
     content = db.Column(db.Text())
+    # Sanitized html rendering of the content, only loaded when requested
+    content_html = deferred(db.Column(db.Text()))
     is_guideline = db.Column(db.Boolean())
     is_current = db.Column(db.Boolean(), default=True)
     post_id = db.Column(db.Integer, server_default=post_id_seq.next_value())
 
+    # Old revisions may store their summary and content as a compressed delta
+    # against a newer revision instead, see drp.revisions. The constraint is
+    # only checked on commit, so that chains can be rebased before deletion.
+    delta = db.Column(db.LargeBinary)
+    delta_base_id = db.Column(db.Integer, db.ForeignKey(
+        "posts.id", deferrable=True, initially="DEFERRED"))
+
     created_at = db.Column(db.DateTime(timezone=True), nullable=False,
                            server_default=func.now())
 
-    tags = relationship("Tag", secondary="post_tag")
+    # Weighted text search vector of the title, summary and content,
+    # maintained by a trigger, see UPDATE_POST_SEARCH_VECTOR
+    search_vector = deferred(db.Column(postgresql.TSVECTOR))
+
+    # Ordered, so that posts always serialize the same way
+    tags = relationship("Tag", secondary="post_tag", order_by="Tag.id")
 
-    files = relationship("File", back_populates="post")
+    files = relationship("File", back_populates="post", order_by="File.id")
     resolves = relationship("Question", back_populates="resolved_by")
 
-    __ts_vector__ = create_tsvector(
-        title,
-        summary,
-        content
-    )
+    # Fetch server generated values (post_id, created_at) on insert
+    __mapper_args__ = {"eager_defaults": True}
 
     __table_args__ = (
         db.Index(
-            'idx_post_fulltextsearch',
-            __ts_vector__,
+            'idx_post_search_vector',
+            search_vector,
             postgresql_using='gin'
         ),
         db.Index(
@@ -55,18 +62,112 @@ class Post(db.Model):
             unique=True,
             postgresql_where=is_current
         ),
+        db.Index('idx_post_created_at_id', created_at, id),
+        db.Index('idx_post_post_id_id', post_id, id),
+        # Search suggestions, see drp.api.search
+        db.Index(
+            'idx_post_title_trgm', title,
+            postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'},
+            postgresql_where=is_current
+        ),
     )
 
     def __repr__(self):
         return f"<Post '{self.title}'>"
 
 
+# Revisions stored as deltas no longer have their summary and content, so
+# they keep the vector computed from their full text
+UPDATE_POST_SEARCH_VECTOR = """
+CREATE OR REPLACE FUNCTION post_search_vector(
+    title text, summary text, content text) RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+           setweight(to_tsvector('english', coalesce(summary, '')), 'B') ||
+           setweight(to_tsvector('english', coalesce(content, '')), 'C');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION update_post_search_vector() RETURNS trigger AS $$
+BEGIN
+    IF NEW.delta IS NULL THEN
+        NEW.search_vector :=
+            post_search_vector(NEW.title, NEW.summary, NEW.content);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER update_post_search_vector
+BEFORE INSERT OR UPDATE OF title, summary, content, delta ON posts
+FOR EACH ROW EXECUTE PROCEDURE update_post_search_vector();
+"""
+
+event.listen(Post.__table__, "after_create",
+             DDL(UPDATE_POST_SEARCH_VECTOR).execute_if(dialect="postgresql"))
+
+
+class CurrentPost(db.Model):
+    """
+    Points to the current revision of each post. Maintained by a trigger on
+    the posts table whenever a revision is inserted, deleted, or its
+    is_current flag changes, so it must not be written to directly.
+    """
+    __tablename__ = "current_posts"
+
+    post_id = db.Column(db.Integer, primary_key=True)
+    revision_id = db.Column(db.Integer,
+                            db.ForeignKey("posts.id", ondelete="CASCADE"),
+                            nullable=False, unique=True)
+
+    revision = relationship("Post", viewonly=True)
+
+    def __repr__(self):
+        return f"<CurrentPost {self.post_id} -> {self.revision_id}>"
+
+
+# Deleted revisions are removed from current_posts by the foreign key
+TRACK_CURRENT_POSTS = """
+CREATE OR REPLACE FUNCTION track_current_posts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.is_current AND NOT NEW.is_current THEN
+        DELETE FROM current_posts
+        WHERE post_id = OLD.post_id AND revision_id = OLD.id;
+    END IF;
+    IF NEW.is_current THEN
+        INSERT INTO current_posts (post_id, revision_id)
+        VALUES (NEW.post_id, NEW.id)
+        ON CONFLICT (post_id) DO UPDATE SET revision_id = EXCLUDED.revision_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER track_current_posts
+AFTER INSERT OR UPDATE OF is_current ON posts
+FOR EACH ROW EXECUTE PROCEDURE track_current_posts();
+"""
+
+event.listen(CurrentPost.__table__, "after_create",
+             DDL(TRACK_CURRENT_POSTS).execute_if(dialect="postgresql"))
+event.listen(CurrentPost.__table__, "before_drop",
+             DDL("DROP TRIGGER IF EXISTS track_current_posts ON posts")
+             .execute_if(dialect="postgresql"))
+
+
 class Tag(db.Model):
     __tablename__ = "tags"
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.Text, unique=True)
 
+    __table_args__ = (
+        db.Index(
+            'idx_tag_name_trgm', name,
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'}
+        ),
+    )
+
     posts = relationship("Post", secondary="post_tag")
 
     def __repr__(self):
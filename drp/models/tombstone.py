@@ -0,0 +1,22 @@
+from sqlalchemy.sql import func
+
+from ..db import db
+
+
+class FileTombstone(db.Model):
+    """
+    An uploaded file whose database record was deleted, and which is still
+    to be removed from the upload folder by `drp.attachments.collect`.
+    """
+    __tablename__ = "file_tombstones"
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(300), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           server_default=func.now())
+
+    def __repr__(self):
+        return f"<FileTombstone '{self.filename}'>"
@@ -1,12 +1,19 @@
 import gzip
 import json
+import time
 import requests
+from datetime import datetime, timezone
 
-from .models import Device
+from .db import db
+from .models import Device, Notification, NotificationStatus
+from .tasks import tasks
 
 
 EXPO_NOTIFICATION_URL = "https://exp.host/--/api/v2/push/send"
 
+# Number of times delivery to expo is attempted before giving up
+MAX_ATTEMPTS = 3
+
 
 def chunks(lst, n):
     for i in range(0, len(lst), n):
@@ -14,6 +21,97 @@ def chunks(lst, n):
 
 
 def broadcast(title: str, body: str, data):
+    """Describes a notification to every registered device, for `queue`."""
+    return {"broadcast": True, "user_id": None, "title": title, "body": body,
+            "data": data}
+
+
+def send_user(user_id, title: str, body: str, data):
+    """Describes a notification to the devices of a user, for `queue`."""
+    return {"broadcast": False, "user_id": user_id, "title": title,
+            "body": body, "data": data}
+
+
+def queue(notifications):
+    """
+    Queues notifications described by `broadcast` or `send_user`, with a
+    single insert into the current transaction. Returns their ids, to be
+    passed to `dispatch` once the transaction is committed.
+    """
+    if len(notifications) == 0:
+        return []
+
+    table = Notification.__table__
+    result = db.session.execute(
+        table.insert().values(notifications).returning(table.c.id))
+
+    return [id for id, in result]
+
+
+def dispatch(ids):
+    """
+    Hands the committed notifications with the given ids over to be
+    delivered in background.
+    """
+    if len(ids) > 0:
+        tasks.submit(deliver_all, list(ids))
+
+
+def deliver_all(ids):
+    for id in ids:
+        deliver(id)
+
+
+def deliver(id):
+    """
+    Sends a pending notification to expo, recording the outcome. Failed
+    requests are retried with exponential backoff up to MAX_ATTEMPTS times.
+    """
+    notification = Notification.query.filter(
+        Notification.id == id).one_or_none()
+
+    if notification is None or \
+            notification.status != NotificationStatus.PENDING:
+        return
+
+    if notification.broadcast:
+        devices = Device.query.all()
+    else:
+        devices = Device.query.filter(
+            Device.user_id == notification.user_id).all()
+
+    while True:
+        notification.attempts += 1
+
+        try:
+            delivered, rejected = push(devices, notification.title,
+                                       notification.body, notification.data)
+        except requests.RequestException as e:
+            notification.error = repr(e)
+
+            if notification.attempts >= MAX_ATTEMPTS:
+                notification.status = NotificationStatus.FAILED
+                db.session.commit()
+                return
+
+            db.session.commit()
+            time.sleep(2 ** notification.attempts)
+            continue
+
+        notification.status = NotificationStatus.SENT
+        notification.delivered = delivered
+        notification.rejected = rejected
+        notification.error = None
+        notification.sent_at = datetime.now(timezone.utc)
+        db.session.commit()
+        return
+
+
+def push(devices, title: str, body: str, data):
+    """
+    Sends a notification to the given devices through expo, returning the
+    number of devices it was accepted and rejected for.
+    """
     headers = {
         "accept": "application/json",
         "accept-encoding": "gzip, deflate",
@@ -21,34 +119,8 @@ def broadcast(title: str, body: str, data):
         "content-encoding": "gzip"
     }
 
-    devices = Device.query.all()
-
-    for chunk in chunks(devices, 100):
-        # Generate message for each target device
-        messages = [{"to": device.expo_push_token,
-                     "sound": "default", "title": title, "body": body,
-                     "data": data}
-                    for device in chunk]
-
-        # Compress request body to reduce overhead with many registered devices
-        body = gzip.compress(json.dumps(messages).encode("utf-8"))
-
-        # Send notification to expo
-        requests.post(EXPO_NOTIFICATION_URL, headers=headers, data=body)
-
-
-def send_user(user, title: str, body: str, data):
-    headers = {
-        "accept": "application/json",
-        "accept-encoding": "gzip, deflate",
-        "content-type": "application/json",
-        "content-encoding": "gzip"
-    }
-
-    devices = Device.query.filter(Device.user_id == user.id).all()
-
-    for d in devices:
-        print(f"Notifying {d.expo_push_token}")
+    delivered = 0
+    rejected = 0
 
     for chunk in chunks(devices, 100):
         # Generate message for each target device
@@ -58,7 +130,18 @@ def send_user(user, title: str, body: str, data):
                     for device in chunk]
 
         # Compress request body to reduce overhead with many registered devices
-        body = gzip.compress(json.dumps(messages).encode("utf-8"))
+        compressed = gzip.compress(json.dumps(messages).encode("utf-8"))
 
         # Send notification to expo
-        requests.post(EXPO_NOTIFICATION_URL, headers=headers, data=body)
+        response = requests.post(EXPO_NOTIFICATION_URL, headers=headers,
+                                 data=compressed, timeout=30)
+        response.raise_for_status()
+
+        # Expo returns a ticket for each message, in order
+        for ticket in response.json().get("data", []):
+            if ticket.get("status") == "ok":
+                delivered += 1
+            else:
+                rejected += 1
+
+    return delivered, rejected
@@ -0,0 +1,14 @@
+import mistune
+
+
+def render_content(content):
+    """
+    Renders the markdown content of a post to html. Raw html in the content
+    is escaped and links with unsafe schemes (e.g. javascript:) are dropped,
+    so the output can be displayed as is.
+    """
+    if content is None:
+        return None
+
+    # Markdown instances keep parser state, so one is created per call
+    return mistune.markdown(content, escape=True)
@@ -0,0 +1,217 @@
+"""
+Storage of old post revisions as compressed deltas.
+
+When a guideline is updated, the summary and content of the revision it
+replaces are swapped for a delta against the new revision. A revision's text
+is then rebuilt by applying the deltas along the chain of newer revisions,
+ending at one stored in full (normally the current revision). Rebuilt texts
+are kept in a bounded cache, since revisions never change.
+"""
+import json
+import re
+import zlib
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+from . import cache
+from .models import Post
+from .rendering import render_content
+
+
+RevisionText = namedtuple("RevisionText", ["summary", "content"])
+
+# Words and the whitespace between them, so that joining tokens restores text
+TOKENS = re.compile(r"\s+|\S+")
+
+# Rebuilt text of revisions stored as deltas, keyed by revision id
+history = cache.register("history", 512)
+
+
+def make_delta(text, base):
+    """
+    Encodes `text` as a list of operations on the lines of `base`: either
+    a [start, end] slice of base lines to copy, or a string to insert.
+    """
+    if text is None:
+        return None
+
+    base_lines = (base or "").splitlines(keepends=True)
+    lines = text.splitlines(keepends=True)
+
+    ops = []
+    matcher = SequenceMatcher(None, base_lines, lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(lines[j1:j2]))
+
+    return ops
+
+
+def apply_delta(ops, base):
+    if ops is None:
+        return None
+
+    base_lines = (base or "").splitlines(keepends=True)
+    return "".join("".join(base_lines[op[0]:op[1]])
+                   if isinstance(op, list) else op for op in ops)
+
+
+def encode(ops):
+    return zlib.compress(json.dumps(ops, separators=(",", ":"))
+                         .encode("utf-8"), 9)
+
+
+def decode(delta):
+    return json.loads(zlib.decompress(delta).decode("utf-8"))
+
+
+def text(revision):
+    """Returns the summary and content of a revision, rebuilding them if the
+    revision is stored as a delta."""
+    if revision.delta is None:
+        return RevisionText(revision.summary, revision.content)
+
+    cached = history.get(revision.id)
+    if cached is not None:
+        return cached
+
+    # Load the whole history of the post at once, so that walking the
+    # chain of bases below is served from the session's identity map
+    Post.query.filter(Post.post_id == revision.post_id).all()
+
+    # Follow the chain, which is as long as the history of the post, up to
+    # the first revision whose text is known
+    chain = [revision]
+    while True:
+        base = Post.query.get(chain[-1].delta_base_id)
+        if base.delta is None:
+            result = RevisionText(base.summary, base.content)
+            break
+
+        result = history.get(base.id)
+        if result is not None:
+            break
+
+        chain.append(base)
+
+    # Then apply the deltas back down to the revision
+    for revision in reversed(chain):
+        ops = decode(revision.delta)
+        result = RevisionText(apply_delta(ops["summary"], result.summary),
+                              apply_delta(ops["content"], result.content))
+        history.set(revision.id, result)
+
+    return result
+
+
+def content_html(revision):
+    if revision.delta is None:
+        return revision.content_html
+    return render_content(text(revision).content)
+
+
+def compact(revision, base):
+    """Replaces the stored text of `revision` by a delta against `base`."""
+    current = text(revision)
+    base_text = text(base)
+
+    revision.delta = encode({
+        "summary": make_delta(current.summary, base_text.summary),
+        "content": make_delta(current.content, base_text.content),
+    })
+    revision.delta_base_id = base.id
+    revision.summary = None
+    revision.content = None
+    revision.content_html = None
+
+    history.set(revision.id, current)
+
+
+def expand(revision):
+    """Stores the text of `revision` in full again."""
+    if revision.delta is None:
+        return
+
+    current = text(revision)
+
+    revision.summary = current.summary
+    revision.content = current.content
+    revision.content_html = render_content(current.content)
+    revision.delta = None
+    revision.delta_base_id = None
+
+
+def detach(revision):
+    """
+    Rebases the revisions stored as deltas against `revision`, so that it
+    can be deleted. Must be called before the revision is deleted.
+    """
+    dependents = Post.query.filter(Post.delta_base_id == revision.id).all()
+
+    for dependent in dependents:
+        if revision.delta_base_id is not None:
+            compact(dependent, Post.query.get(revision.delta_base_id))
+        else:
+            expand(dependent)
+
+
+def compact_history(post_id):
+    """
+    Stores every old revision of a post as a delta against the next newer
+    revision. Returns the number of revisions compacted.
+    """
+    revisions = Post.query.filter(Post.post_id == post_id) \
+        .order_by(Post.id.desc()).all()
+
+    compacted = 0
+    for newer, older in zip(revisions, revisions[1:]):
+        if older.is_current or older.delta is not None:
+            continue
+        compact(older, newer)
+        compacted += 1
+
+    return compacted
+
+
+def diff(old, new):
+    """
+    Compares two texts line by line, and changed lines word by word.
+    Returns a list of (op, text) chunks, where op is "equal", "delete" or
+    "insert". Joining the chunks that are not inserted gives `old`, and
+    joining the ones that are not deleted gives `new`.
+    """
+    old_lines = (old or "").splitlines(keepends=True)
+    new_lines = (new or "").splitlines(keepends=True)
+
+    chunks = []
+
+    def add(op, text):
+        if text == "":
+            return
+        if len(chunks) > 0 and chunks[-1][0] == op:
+            chunks[-1] = (op, chunks[-1][1] + text)
+        else:
+            chunks.append((op, text))
+
+    def add_opcodes(a, b, opcodes):
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal":
+                add("equal", "".join(a[i1:i2]))
+            else:
+                add("delete", "".join(a[i1:i2]))
+                add("insert", "".join(b[j1:j2]))
+
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "replace":
+            old_words = TOKENS.findall("".join(old_lines[i1:i2]))
+            new_words = TOKENS.findall("".join(new_lines[j1:j2]))
+            words = SequenceMatcher(None, old_words, new_words,
+                                    autojunk=False)
+            add_opcodes(old_words, new_words, words.get_opcodes())
+        else:
+            add_opcodes(old_lines, new_lines, [(tag, i1, i2, j1, j2)])
+
+    return chunks
@@ -0,0 +1,129 @@
+"""
+Full text search support: caching of search results and maintenance of the
+stored text search vectors of post revisions.
+
+Search results are cached by the text search query the searched string
+normalizes to, so that searches differing only in case, punctuation or
+stop words share an entry. Like the fragments cache, the cache follows
+writes made by other processes through the post change log, and is dropped
+as soon as new entries are logged.
+
+Each revision stores a vector of its title, summary and content, weighted in
+that order, which a trigger recomputes whenever they are written. `rebuild`
+recomputes the vectors of existing revisions, e.g. after the text search
+configuration changed.
+"""
+import threading
+
+from sqlalchemy.dialects.postgresql import TEXT
+from sqlalchemy.orm import load_only
+from sqlalchemy.sql import func
+from sqlalchemy.sql.expression import cast
+
+from . import cache, changes, revisions
+from .db import db
+from .models import Post
+
+
+# Search results, keyed by the normalized query and the search parameters
+results = cache.register("searches", 256)
+
+# Text search query that searched strings normalize to
+queries = cache.register("search_queries", 1024)
+
+follower = changes.LogFollower()
+_seen = set()
+_sync_lock = threading.Lock()
+
+
+def normalize(searched):
+    """Returns the text of the plainto_tsquery of a searched string."""
+    normalized = queries.get(searched)
+
+    if normalized is None:
+        normalized = db.session.query(
+            cast(func.plainto_tsquery("english", searched), TEXT)).scalar()
+        queries.set(searched, normalized)
+
+    return normalized
+
+
+def sync():
+    """Drops the cached results if posts changed since the last call."""
+    global _seen
+
+    # Entries logged recently are read again by every call, so only ones not
+    # seen before mean that the results may have changed
+    entries = follower.read() or []
+    ids = {entry.id for entry in entries}
+
+    with _sync_lock:
+        if len(ids - _seen) > 0:
+            results.clear()
+        _seen = ids
+
+
+def cached(key, run):
+    """
+    Returns the results of a search, running it with `run` unless they are
+    cached under `key`.
+    """
+    sync()
+    return results.get_or_set(key, run)
+
+
+def reset():
+    """Empties the cache, e.g. once the change log has been recreated."""
+    global _seen
+
+    results.clear()
+    follower.reset()
+    _seen = set()
+
+
+# Writes made by this process are visible to it straight away
+cache.invalidation_listeners.append(lambda post_id: results.clear())
+
+
+def rebuild(batch_size=100, progress=None):
+    """
+    Recomputes the search vector of every revision, committing after each
+    batch of `batch_size` revisions. Revisions stored as deltas are rebuilt
+    from their text first, since Postgres cannot read it. Returns the number
+    of revisions updated.
+    """
+    updated = 0
+    last_id = 0
+
+    while True:
+        batch = Post.query \
+            .options(load_only(Post.id, Post.post_id, Post.title,
+                               Post.delta, Post.delta_base_id)) \
+            .filter(Post.id > last_id) \
+            .order_by(Post.id).limit(batch_size).all()
+
+        if len(batch) == 0:
+            return updated
+
+        full = [post.id for post in batch if post.delta is None]
+        if len(full) > 0:
+            Post.query.filter(Post.id.in_(full)).update(
+                {Post.search_vector: func.post_search_vector(
+                    Post.title, Post.summary, Post.content)},
+                synchronize_session=False)
+
+        for post in batch:
+            if post.delta is not None:
+                text = revisions.text(post)
+                Post.query.filter(Post.id == post.id).update(
+                    {Post.search_vector: func.post_search_vector(
+                        post.title, text.summary, text.content)},
+                    synchronize_session=False)
+
+        updated += len(batch)
+        last_id = batch[-1].id
+
+        db.session.commit()
+
+        if progress is not None:
+            progress(updated)
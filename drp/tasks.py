@@ -0,0 +1,50 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+
+class TaskRunner:
+    """
+    Runs functions outside of the request that scheduled them, in a pool of
+    background threads owned by the current process. Each task runs inside
+    its own application context, and so gets its own database session.
+
+    If the `ASYNC_TASKS` config option is False, tasks run immediately in
+    the calling thread instead, which is useful for tests.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault("ASYNC_TASKS", True)
+        app.config.setdefault("TASK_WORKERS", 2)
+
+    def submit(self, f, *args):
+        app = current_app._get_current_object()
+
+        if not app.config["ASYNC_TASKS"]:
+            f(*args)
+            return
+
+        self._get_executor(app).submit(self._run, app, f, args)
+
+    def _get_executor(self, app):
+        # Created lazily so that each forked server worker gets its own
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=app.config["TASK_WORKERS"])
+            return self._executor
+
+    def _run(self, app, f, args):
+        with app.app_context():
+            try:
+                f(*args)
+            except Exception:
+                app.logger.exception(f"Background task {f.__name__} failed")
+
+
+tasks = TaskRunner()
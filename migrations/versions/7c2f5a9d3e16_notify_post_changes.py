@@ -0,0 +1,35 @@
+"""Notify listeners of post changes
+
+Revision ID: 7c2f5a9d3e16
+Revises: 3d6a8f2e4b91
+Create Date: 2026-10-17 18:04:52.661390
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2f5a9d3e16'
+down_revision = '3d6a8f2e4b91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+    CREATE OR REPLACE FUNCTION notify_post_changes() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('post_changes', '');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER notify_post_changes
+    AFTER INSERT ON post_changes
+    FOR EACH STATEMENT EXECUTE PROCEDURE notify_post_changes();
+    """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS notify_post_changes ON post_changes")
+    op.execute("DROP FUNCTION IF EXISTS notify_post_changes()")
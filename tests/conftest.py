@@ -1,13 +1,14 @@
 import os
 import pytest
 
-from drp import create_app
+from drp import cache, create_app, fragments, search
+from drp.catalog import catalog
 from drp.db import db as _db
 
 
 @pytest.fixture(scope="session")
 def app():
-    options = {"TEST": True}
+    options = {"TEST": True, "ASYNC_TASKS": False}
     db = os.environ.get("TEST_DATABASE_URI")
 
     if db is not None:
@@ -26,6 +27,12 @@ def db(app, db_downgrade):
     with app.app_context():
         _db.drop_all()
 
+    # Ids are reused once the tables are recreated
+    cache.clear_all()
+    fragments.reset()
+    search.reset()
+    catalog.reset()
+
 
 @pytest.fixture(scope="session")
 def db_downgrade(app):
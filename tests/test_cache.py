@@ -0,0 +1,106 @@
+import threading
+import time
+
+from drp.cache import LRUCache
+
+
+def test_cache_evicts_least_recently_used():
+    cache = LRUCache("test", 2)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_counts_hits_and_misses():
+    cache = LRUCache("test", 2)
+
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_cache_drops_stale_entries():
+    cache = LRUCache("test", 2)
+
+    cache.set("a", 1)
+
+    assert cache.get("a", valid=lambda value: value == 2) is None
+    assert len(cache) == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_discard_where():
+    cache = LRUCache("test", 4)
+
+    cache.set(("list", 1), 1)
+    cache.set(("post", 1), 2)
+    cache.set(("post", 2), 3)
+
+    cache.discard_where(lambda key: key == ("post", 1) or key[0] == "list")
+
+    assert len(cache) == 1
+    assert cache.get(("post", 2)) == 3
+
+
+def test_disabled_cache():
+    cache = LRUCache("test", 0)
+
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
+
+
+def test_cache_collapses_concurrent_misses():
+    cache = LRUCache("test", 2)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def build():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "value"
+
+    results = []
+    threads = [threading.Thread(
+        target=lambda: results.append(cache.get_or_set("a", build)))
+        for i in range(0, 4)]
+
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    while cache.stats()["collapsed"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+    assert cache.get("a") == "value"
+
+
+def test_cache_does_not_store_entries_built_across_a_clear():
+    cache = LRUCache("test", 2)
+
+    def build():
+        cache.clear()
+        return "stale"
+
+    assert cache.get_or_set("a", build) == "stale"
+    assert cache.get_or_set("a", lambda: "fresh") == "fresh"
+    assert cache.get("a") == "fresh"
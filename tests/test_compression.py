@@ -0,0 +1,49 @@
+import gzip
+import json
+
+from drp.compression import PrecompressedBody, compress_response
+
+
+def json_response(app, data):
+    return app.response_class(json.dumps(data), mimetype="application/json")
+
+
+def test_large_response_is_compressed(app):
+    data = [{"content": "A few paragraphs of content..."}] * 100
+
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = compress_response(json_response(app, data))
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.vary
+        assert json.loads(gzip.decompress(response.get_data())) == data
+
+
+def test_small_response_is_not_compressed(app):
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = compress_response(json_response(app, {"id": 1}))
+
+        assert "Content-Encoding" not in response.headers
+
+
+def test_response_is_not_compressed_if_not_accepted(app):
+    data = [{"content": "A few paragraphs of content..."}] * 100
+
+    with app.test_request_context():
+        response = compress_response(json_response(app, data))
+
+        assert "Content-Encoding" not in response.headers
+        assert json.loads(response.get_data()) == data
+
+
+def test_precompressed_body_compresses_once(app):
+    data = json.dumps([{"content": "Some content"}] * 100).encode("utf-8")
+    body = PrecompressedBody(data)
+
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        first = body.apply(app.response_class(mimetype="application/json"))
+        second = body.apply(app.response_class(mimetype="application/json"))
+
+        assert first.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(second.get_data()) == data
+        assert body.variant("gzip") is body.variant("gzip")
@@ -0,0 +1,29 @@
+import json
+from datetime import datetime, timezone
+
+from drp import encoding
+
+
+def test_dumps_is_compact_utf8():
+    data = {"title": "Alpha /ˈælfə/", "tags": [{"id": 1}], "ok": True}
+
+    assert encoding.dumps(data) == \
+        '{"title":"Alpha /ˈælfə/","tags":[{"id":1}],"ok":true}' \
+        .encode("utf-8")
+
+
+def test_dumps_encodes_datetimes():
+    created_at = datetime(2020, 6, 17, 21, 56, 53, 52092, tzinfo=timezone.utc)
+
+    assert json.loads(encoding.dumps({"created_at": created_at})) == \
+        {"created_at": created_at.isoformat()}
+
+
+def test_dumps_fallback_matches(monkeypatch):
+    data = {"content": "Line\nbreak \"quoted\" \x01 é", "id": 3,
+            "files": [], "summary": None}
+    fast = encoding.dumps(data)
+
+    monkeypatch.setattr(encoding, "orjson", None)
+
+    assert encoding.dumps(data) == fast
@@ -3,7 +3,8 @@ import os
 from io import BytesIO
 from hashlib import sha256
 
-from drp.models import File, Post
+from drp import attachments
+from drp.models import File, FileTombstone, Post
 
 
 def create_test_post(app, db):
@@ -234,3 +235,32 @@ def test_delete_file_that_doesnt_exist(app, db):
         response = client.delete("/api/files/42")
 
         assert "404" in response.status
+
+
+def test_collect_files_retries_failed_removals(app, db, mocker):
+    with app.app_context():
+        db.session.add_all([FileTombstone(filename="missing.pdf"),
+                            FileTombstone(filename="locked.pdf")])
+        db.session.commit()
+
+        def remove(path):
+            if path.endswith("locked.pdf"):
+                raise PermissionError()
+            raise FileNotFoundError()
+
+        mocker.patch("os.remove", side_effect=remove)
+        progress = mocker.Mock()
+
+        assert attachments.collect(batch_size=1, progress=progress) == (1, 1)
+        assert progress.call_count == 2
+
+        tombstone = FileTombstone.query.one()
+        assert tombstone.filename == "locked.pdf"
+        assert tombstone.attempts == 1
+
+        for _ in range(attachments.MAX_ATTEMPTS):
+            attachments.collect()
+
+        # Given up on, but kept for inspection
+        tombstone = FileTombstone.query.one()
+        assert tombstone.attempts == attachments.MAX_ATTEMPTS
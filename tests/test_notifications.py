@@ -0,0 +1,69 @@
+import requests
+
+from drp import notifications
+from drp.models import Device, Notification, NotificationStatus
+
+
+def test_create_post_queues_broadcast(app, db):
+    with app.test_client() as client:
+        post = {
+            "title": "A title",
+            "summary": "A summary",
+            "content": "A content"
+        }
+
+        response = client.post('/api/posts',
+                               content_type='multipart/form-data',
+                               data=post)
+        assert "200" in response.status
+
+    with app.app_context():
+        notification = Notification.query.one()
+
+        assert notification.broadcast
+        assert notification.title == "A title"
+        assert notification.status == NotificationStatus.SENT
+        assert notification.delivered == 0
+
+
+def test_deliver_records_tickets(app, db, mocker):
+    response = mocker.Mock()
+    response.json.return_value = {"data": [{"status": "ok"},
+                                           {"status": "error"}]}
+    post = mocker.patch("requests.post", return_value=response)
+
+    with app.app_context():
+        db.session.add(Device(expo_push_token="token1"))
+        db.session.add(Device(expo_push_token="token2"))
+        id, = notifications.queue(
+            [notifications.broadcast("A title", "A body", {"id": 1})])
+        db.session.commit()
+
+        notifications.deliver(id)
+
+        notification = Notification.query.one()
+
+        assert post.call_count == 1
+        assert notification.status == NotificationStatus.SENT
+        assert notification.delivered == 1
+        assert notification.rejected == 1
+
+
+def test_deliver_gives_up_after_retries(app, db, mocker):
+    mocker.patch("requests.post",
+                 side_effect=requests.ConnectionError("unreachable"))
+    mocker.patch("time.sleep")
+
+    with app.app_context():
+        db.session.add(Device(expo_push_token="token"))
+        id, = notifications.queue(
+            [notifications.broadcast("A title", "A body", {"id": 1})])
+        db.session.commit()
+
+        notifications.deliver(id)
+
+        notification = Notification.query.one()
+
+        assert notification.status == NotificationStatus.FAILED
+        assert notification.attempts == notifications.MAX_ATTEMPTS
+        assert "unreachable" in notification.error
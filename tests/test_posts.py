@@ -3,7 +3,9 @@ import os
 from io import BytesIO
 from hashlib import sha256
 
-from drp.models import Post, Tag, File
+from drp import cache
+from drp.models import Post, CurrentPost, Tag, File, Question, User, \
+    Notification
 
 
 def create_posts(app, db, posts):
@@ -498,3 +500,786 @@ def test_timezone_utc(app, db):
             post["created_at"]).replace(tzinfo=None)
 
         assert utc_now - created_at < timedelta(milliseconds=5000)
+
+
+def test_get_all_posts_query_count_is_constant(app, db):
+    def create_tagged_posts(count):
+        with app.app_context():
+            tag = Tag.query.filter(Tag.name == "Tag").one_or_none()
+            if tag is None:
+                tag = Tag(name="Tag")
+            for i in range(0, count):
+                post = Post(title="A title", summary="A summary",
+                            content="A content", tags=[tag])
+                db.session.add(post)
+                db.session.add(File(name="file.pdf", filename="file.pdf",
+                                    post=post))
+            db.session.commit()
+
+    def count_queries(client):
+        response = client.get("/api/posts")
+        assert "200" in response.status
+        return int(response.headers["X-Query-Count"])
+
+    with app.test_client() as client:
+        create_tagged_posts(2)
+        few = count_queries(client)
+
+        create_tagged_posts(20)
+        many = count_queries(client)
+
+        assert few == many
+
+
+def test_create_post_query_count_is_constant(app, db, mocker):
+    # Notifications are delivered by background tasks, run inline in tests
+    deliver_all = mocker.patch("drp.notifications.deliver_all")
+
+    with app.app_context():
+        for i in range(0, 5):
+            db.session.add(Tag(name=f"Tag {i}"))
+            user = User(email=f"user{i}@nhs.net", password_hash="hash",
+                        confirmed=True)
+            db.session.add(Question(text=f"Question {i}", user=user))
+        db.session.commit()
+
+        question_ids = [q.id for q in Question.query.order_by(Question.id)]
+
+    def count_queries(client, count, resolves):
+        post = {
+            "title": "A title",
+            "summary": "A summary",
+            "content": "A content",
+            "tags": [f"Tag {i}" for i in range(0, count)],
+            "files": [(BytesIO(b"content"), f"file{i}.pdf")
+                      for i in range(0, count)],
+            "names": [f"file{i}.pdf" for i in range(0, count)],
+            "resolves": resolves,
+        }
+        response = client.post("/api/posts", data=post,
+                               content_type="multipart/form-data")
+        assert "200" in response.status
+
+        data = json.loads(response.data.decode("utf-8"))
+        assert len(data["tags"]) == count
+        assert len(data["files"]) == count
+
+        return int(response.headers["X-Query-Count"])
+
+    with app.test_client() as client:
+        few = count_queries(client, 1, question_ids[:1])
+        many = count_queries(client, 5, question_ids[1:])
+
+        assert few == many
+
+    with app.app_context():
+        assert Question.query.filter(Question.resolved).count() == 5
+        assert Notification.query.filter(
+            Notification.broadcast.is_(False)).count() == 5
+        assert Notification.query.count() == 7
+
+    assert len(deliver_all.call_args_list[1][0][0]) == 5
+
+
+def test_update_post_query_count_is_constant(app, db, mocker):
+    mocker.patch("drp.notifications.deliver_all")
+
+    with app.app_context():
+        for i in range(0, 6):
+            db.session.add(Tag(name=f"Tag {i}"))
+            user = User(email=f"user{i}@nhs.net", password_hash="hash",
+                        confirmed=True)
+            db.session.add(Question(text=f"Question {i}", user=user))
+        db.session.commit()
+
+        question_ids = [q.id for q in Question.query.order_by(Question.id)]
+
+    def update(client, id, count, resolves):
+        post = {
+            "title": "A title",
+            "summary": "A summary",
+            "content": "A content",
+            "is_guideline": "true",
+            "tags": [f"Tag {i}" for i in range(0, count)],
+            "files": [(BytesIO(b"content"), f"file{i}.pdf")
+                      for i in range(0, count)],
+            "names": [f"file{i}.pdf" for i in range(0, count)],
+            "resolves": resolves,
+        }
+        if id is not None:
+            post["updates"] = str(id)
+
+        response = client.post("/api/posts", data=post,
+                               content_type="multipart/form-data")
+        assert "200" in response.status
+
+        data = json.loads(response.data.decode("utf-8"))
+        assert id is None or data["id"] == id
+        assert len(data["tags"]) == count
+
+        return data["id"], int(response.headers["X-Query-Count"])
+
+    with app.test_client() as client:
+        id, _ = update(client, None, 0, [])
+        _, few = update(client, id, 1, question_ids[:1])
+        _, many = update(client, id, 5, question_ids[1:])
+
+        assert few == many
+
+    with app.app_context():
+        current = Post.query.filter(Post.post_id == id, Post.is_current) \
+            .one()
+        # Questions resolved by older revisions follow the current one
+        assert Question.query.filter(
+            Question.post_id == current.id).count() == 6
+
+
+def test_get_posts_with_cursor(app, db):
+    create_posts(app, db, [Post(title=f"Post {i}", summary="A summary",
+                                content="A content")
+                           for i in range(0, 5)])
+
+    with app.test_client() as client:
+        response = client.get("/api/posts?per_page=2")
+        assert "200" in response.status
+
+        titles = [post["title"] for post in json.loads(
+            response.data.decode("utf-8"))]
+
+        while "X-Next-Cursor" in response.headers:
+            cursor = response.headers["X-Next-Cursor"]
+            response = client.get(f"/api/posts?per_page=2&cursor={cursor}")
+            assert "200" in response.status
+
+            titles += [post["title"] for post in json.loads(
+                response.data.decode("utf-8"))]
+
+        assert sorted(titles) == [f"Post {i}" for i in range(0, 5)]
+
+
+def test_get_posts_with_invalid_cursor(app, db):
+    with app.test_client() as client:
+        response = client.get("/api/posts?per_page=2&cursor=invalid")
+        assert "400" in response.status
+
+
+def test_get_posts_with_cursor_without_time_zone(app, db, monkeypatch):
+    from drp.api.pagination import encode_cursor
+
+    monkeypatch.setitem(app.config, "CATALOG_ENABLED", True)
+    monkeypatch.setitem(app.config, "CATALOG_LISTEN", False)
+    monkeypatch.setitem(app.config, "CATALOG_MAX_AGE", 3600)
+
+    create_posts(app, db, [Post(title=f"Post {i}", summary="A summary",
+                                content="A content")
+                           for i in range(0, 3)])
+
+    with app.test_client() as client:
+        cursor = encode_cursor("2100-01-01T00:00:00", 0)
+        response = client.get(f"/api/posts?per_page=2&cursor={cursor}")
+        assert "200" in response.status
+        assert len(json.loads(response.data.decode("utf-8"))) == 2
+
+        response = client.get(f"/api/posts?per_page=2&cursor={cursor}"
+                              "&include_old=true")
+        assert "200" in response.status
+        assert len(json.loads(response.data.decode("utf-8"))) == 2
+
+
+def test_get_posts_not_modified(app, db):
+    create_posts(app, db, [Post(title="A title", summary="A summary",
+                                content="A content")])
+
+    with app.test_client() as client:
+        response = client.get("/api/posts")
+        assert "200" in response.status
+
+        etag = response.headers["ETag"]
+
+        response = client.get("/api/posts",
+                              headers={"If-None-Match": etag})
+        assert "304" in response.status
+        assert response.data == b""
+
+        create_posts(app, db, [Post(title="A new title", summary="A summary",
+                                    content="A content")])
+
+        response = client.get("/api/posts",
+                              headers={"If-None-Match": etag})
+        assert "200" in response.status
+        assert response.headers["ETag"] != etag
+
+
+def test_get_compressed_posts_not_modified(app, db):
+    create_posts(app, db, [Post(title="A title", summary="A summary",
+                                content="A content " * 200)])
+
+    with app.test_client() as client:
+        headers = {"Accept-Encoding": "gzip"}
+        response = client.get("/api/posts", headers=headers)
+        assert response.headers["Content-Encoding"] == "gzip"
+
+        etag = response.headers["ETag"]
+        assert etag.startswith("W/")
+
+        response = client.get("/api/posts",
+                              headers=dict(headers, **{"If-None-Match": etag}))
+        assert "304" in response.status
+        assert response.headers["ETag"] == etag
+
+
+def test_get_single_post_not_modified(app, db):
+    with app.app_context():
+        post = Post(title="A title", summary="A summary", content="A content")
+        db.session.add(post)
+        db.session.commit()
+        id = post.post_id
+
+    with app.test_client() as client:
+        response = client.get(f"/api/posts/{id}")
+        assert "200" in response.status
+
+        etag = response.headers["ETag"]
+
+        response = client.get(f"/api/posts/{id}",
+                              headers={"If-None-Match": etag})
+        assert "304" in response.status
+
+        response = client.get(f"/api/posts/{id}?include_old=true",
+                              headers={"If-None-Match": etag})
+        assert "200" in response.status
+
+
+def test_get_posts_is_cached_until_a_post_is_created(app, db):
+    create_posts(app, db, [Post(title="A title", summary="A summary",
+                                content="A content")])
+
+    with app.test_client() as client:
+        response = client.get("/api/posts?per_page=10")
+        assert "200" in response.status
+
+        hits = cache.responses.hits
+
+        response = client.get("/api/posts?per_page=10")
+        assert "200" in response.status
+        assert cache.responses.hits == hits + 1
+
+        response = client.post('/api/posts',
+                               content_type='multipart/form-data',
+                               data={"title": "A new title",
+                                     "summary": "A summary",
+                                     "content": "A content"})
+        assert "200" in response.status
+
+        response = client.get("/api/posts?per_page=10")
+        assert "200" in response.status
+
+        data = json.loads(response.data.decode("utf-8"))
+        assert len(data) == 2
+        assert cache.responses.hits == hits + 1
+
+
+def test_get_post_changes(app, db):
+    with app.test_client() as client:
+        response = client.get("/api/posts/changes")
+        assert "200" in response.status
+
+        cursor = json.loads(response.data.decode("utf-8"))["cursor"]
+
+        response = client.post('/api/posts',
+                               content_type='multipart/form-data',
+                               data={"title": "A title",
+                                     "summary": "A summary",
+                                     "content": "A content",
+                                     "is_guideline": "true"})
+        assert "200" in response.status
+
+        old = json.loads(response.data.decode("utf-8"))
+
+        response = client.post('/api/posts',
+                               content_type='multipart/form-data',
+                               data={"title": "A new title",
+                                     "summary": "A summary",
+                                     "content": "A content",
+                                     "is_guideline": "true",
+                                     "updates": str(old["id"])})
+        assert "200" in response.status
+
+        new = json.loads(response.data.decode("utf-8"))
+
+        response = client.get(f"/api/posts/changes?since={cursor}")
+        assert "200" in response.status
+
+        changes = json.loads(response.data.decode("utf-8"))
+
+        assert [r["revision_id"] for r in changes["revisions"]] == \
+            [old["revision_id"], new["revision_id"]]
+        assert changes["superseded"] == [old["revision_id"]]
+        assert changes["deleted"] == []
+        assert not changes["more"]
+
+        cursor = changes["cursor"]
+
+        response = client.delete(f"/api/posts/{old['id']}")
+        assert "204" in response.status
+
+        response = client.get(f"/api/posts/changes?since={cursor}")
+        changes = json.loads(response.data.decode("utf-8"))
+
+        assert changes["revisions"] == []
+        assert changes["deleted"] == [old["id"]]
+
+
+def test_post_changes_limit_must_be_positive(app, db):
+    with app.test_client() as client:
+        response = client.get("/api/posts/changes")
+        cursor = json.loads(response.data.decode("utf-8"))["cursor"]
+
+        response = client.get(f"/api/posts/changes?since={cursor}&limit=0")
+        assert "400" in response.status
+
+
+def test_post_changes_are_paginated_by_default(app, db):
+    with app.test_client() as client:
+        response = client.get("/api/posts/changes")
+        cursor = json.loads(response.data.decode("utf-8"))["cursor"]
+
+        create_posts(app, db, [Post(title="A title", summary="A summary",
+                                    content="A content")])
+        with app.app_context():
+            from drp import changes
+            from drp.models import ChangeKind
+            for i in range(0, 501):
+                changes.record(ChangeKind.UPDATED, post_id=1)
+            db.session.commit()
+
+        response = client.get(f"/api/posts/changes?since={cursor}")
+        data = json.loads(response.data.decode("utf-8"))
+        assert data["more"]
+
+        response = client.get(f"/api/posts/changes?since={data['cursor']}")
+        data = json.loads(response.data.decode("utf-8"))
+        assert not data["more"]
+
+
+def test_post_change_log_writes_are_serialized(app, db):
+    from drp import changes
+    from drp.models import ChangeKind
+    from sqlalchemy import select, func
+
+    try_lock = select([func.pg_try_advisory_xact_lock(changes.LOG_LOCK)])
+
+    with app.app_context():
+        changes.record(ChangeKind.DELETED, post_id=1)
+
+        # Other transactions cannot log entries until this one ends
+        with db.engine.begin() as connection:
+            assert not connection.execute(try_lock).scalar()
+
+        db.session.commit()
+
+        with db.engine.begin() as connection:
+            assert connection.execute(try_lock).scalar()
+
+
+def test_get_posts_with_fields(app, db):
+    create_posts(app, db, [Post(title="A title", summary="A summary",
+                                content="A content")])
+
+    with app.test_client() as client:
+        response = client.get("/api/posts?fields=id,title,tags")
+        assert "200" in response.status
+
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert len(data) == 1
+        assert list(data[0].keys()) == ["id", "title", "tags"]
+        assert data[0]["title"] == "A title"
+
+
+def test_get_posts_with_unknown_fields(app, db):
+    with app.test_client() as client:
+        response = client.get("/api/posts?fields=id,body")
+        assert "400" in response.status
+
+
+def test_create_post_renders_content(app, db):
+    with app.test_client() as client:
+        post = {
+            "title": "A title",
+            "summary": "A summary",
+            "content": "Some **bold** text <script>alert(1)</script>"
+        }
+
+        response = client.post('/api/posts',
+                               content_type='multipart/form-data',
+                               data=post)
+        assert "200" in response.status
+
+        data = json.loads(response.data.decode("utf-8"))
+        assert "content_html" not in data
+
+        response = client.get(f"/api/posts/{data['id']}"
+                              "?fields=id,content_html")
+        assert "200" in response.status
+
+        data = json.loads(response.data.decode("utf-8"))[0]
+
+        assert "<strong>bold</strong>" in data["content_html"]
+        assert "<script>" not in data["content_html"]
+
+
+def test_old_revisions_are_stored_as_deltas(app, db):
+    contents = ["First paragraph\n\nSecond paragraph\n",
+                "First paragraph\n\nChanged paragraph\n",
+                "New first paragraph\n\nChanged paragraph\n"]
+
+    with app.test_client() as client:
+        id = None
+        for i, content in enumerate(contents):
+            post = {"title": f"Revision {i}", "summary": f"Summary {i}",
+                    "content": content, "is_guideline": "true"}
+            if id is not None:
+                post["updates"] = str(id)
+
+            response = client.post('/api/posts',
+                                   content_type='multipart/form-data',
+                                   data=post)
+            assert "200" in response.status
+            id = json.loads(response.data.decode("utf-8"))["id"]
+
+        with app.app_context():
+            revisions = Post.query.filter(Post.post_id == id) \
+                .order_by(Post.id).all()
+            assert [r.content is None for r in revisions] == \
+                [True, True, False]
+            assert revisions[0].delta_base_id == revisions[1].id
+
+        # Rebuilt from the deltas, bypassing the cache of rebuilt texts
+        cache.clear_all()
+        response = client.get(f"/api/posts/{id}?include_old=true")
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert [post["content"] for post in data] == contents
+        assert [post["summary"] for post in data] == \
+            ["Summary 0", "Summary 1", "Summary 2"]
+
+        # Deleting the middle revision rebases the oldest one
+        response = client.delete(f"/api/revisions/{data[1]['revision_id']}")
+        assert "204" in response.status
+
+        # Deleting the current revision promotes the oldest one
+        response = client.delete(f"/api/revisions/{data[2]['revision_id']}")
+        assert "204" in response.status
+
+        cache.clear_all()
+        response = client.get(f"/api/posts/{id}?fields=content,content_html")
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert data == [{"content": contents[0],
+                         "content_html": "<p>First paragraph</p>\n"
+                                         "<p>Second paragraph</p>\n"}]
+
+
+def test_get_revision_history(app, db):
+    with app.app_context():
+        first = Post(title="Revision 0", summary="", content="Content",
+                     is_guideline=True, is_current=False)
+        db.session.add(first)
+        db.session.commit()
+        id = first.post_id
+
+        for i in range(1, 5):
+            db.session.add(Post(title=f"Revision {i}", summary="",
+                                content="Content", is_guideline=True,
+                                is_current=(i == 4), post_id=id))
+        db.session.commit()
+
+    with app.test_client() as client:
+        response = client.get(f"/api/posts/{id}/revisions?per_page=3")
+        assert "200" in response.status
+
+        data = json.loads(response.data.decode("utf-8"))
+        assert [post["title"] for post in data] == \
+            ["Revision 4", "Revision 3", "Revision 2"]
+        assert set(data[0].keys()) == \
+            {"title", "is_current", "revision_id", "created_at"}
+        assert data[0]["is_current"]
+
+        cursor = response.headers["X-Next-Cursor"]
+        response = client.get(f"/api/posts/{id}/revisions?per_page=3"
+                              f"&cursor={cursor}&fields=title,content")
+        assert "200" in response.status
+        assert "X-Next-Cursor" not in response.headers
+
+        data = json.loads(response.data.decode("utf-8"))
+        assert data == [{"title": "Revision 1", "content": "Content"},
+                        {"title": "Revision 0", "content": "Content"}]
+
+        response = client.get(f"/api/posts/{id + 1}/revisions")
+        assert "404" in response.status
+
+
+def test_current_post_pointers_follow_revisions(app, db):
+    with app.test_client() as client:
+        post = {"title": "A title", "summary": "", "content": "",
+                "is_guideline": "true"}
+        response = client.post('/api/posts',
+                               content_type='multipart/form-data',
+                               data=post)
+        first = json.loads(response.data.decode("utf-8"))
+
+        post["updates"] = str(first["id"])
+        response = client.post('/api/posts',
+                               content_type='multipart/form-data',
+                               data=post)
+        second = json.loads(response.data.decode("utf-8"))
+
+        with app.app_context():
+            pointer = CurrentPost.query.get(first["id"])
+            assert pointer.revision_id == second["revision_id"]
+
+        response = client.delete(f"/api/revisions/{second['revision_id']}")
+        assert "204" in response.status
+
+        with app.app_context():
+            pointer = CurrentPost.query.get(first["id"])
+            assert pointer.revision_id == first["revision_id"]
+
+        response = client.delete(f"/api/posts/{first['id']}")
+        assert "204" in response.status
+
+        with app.app_context():
+            assert CurrentPost.query.count() == 0
+
+
+def test_get_diff_between_revisions(app, db):
+    with app.app_context():
+        old = Post(title="A title", summary="A summary",
+                   content="Give 5mg.\nMonitor daily.\n", is_guideline=True,
+                   is_current=False)
+        db.session.add(old)
+        db.session.commit()
+        new = Post(title="A title", summary="A summary",
+                   content="Give 10mg.\nMonitor daily.\n", is_guideline=True,
+                   post_id=old.post_id)
+        db.session.add(new)
+        db.session.commit()
+        id, old_id, new_id = old.post_id, old.id, new.id
+
+    with app.test_client() as client:
+        for _ in range(2):
+            response = client.get(f"/api/posts/{id}/diff"
+                                  f"?from={old_id}&to={new_id}")
+            assert "200" in response.status
+
+            data = json.loads(response.data.decode("utf-8"))
+            assert data["title"] == [{"op": "equal", "text": "A title"}]
+            assert data["content"] == [
+                {"op": "equal", "text": "Give "},
+                {"op": "delete", "text": "5mg."},
+                {"op": "insert", "text": "10mg."},
+                {"op": "equal", "text": "\nMonitor daily.\n"},
+            ]
+
+        response = client.get(f"/api/posts/{id}/diff?from={old_id}")
+        assert "400" in response.status
+
+        response = client.delete(f"/api/revisions/{old_id}")
+        assert "204" in response.status
+
+        response = client.get(f"/api/posts/{id}/diff"
+                              f"?from={old_id}&to={new_id}")
+        assert "404" in response.status
+
+
+def test_fetch_changed_posts(app, db):
+    with app.app_context():
+        old = Post(title="Old", summary="", content="", is_guideline=True,
+                   is_current=False)
+        unchanged = Post(title="Unchanged", summary="", content="")
+        db.session.add_all([old, unchanged])
+        db.session.commit()
+        new = Post(title="New", summary="", content="", is_guideline=True,
+                   post_id=old.post_id)
+        db.session.add(new)
+        db.session.commit()
+        updated_id, old_id = old.post_id, old.id
+        unchanged_id, unchanged_revision = unchanged.post_id, unchanged.id
+        missing_id = max(updated_id, unchanged_id) + 1
+
+    with app.test_client() as client:
+        response = client.get(
+            f"/api/fetch/posts/?ids={updated_id}:{old_id},"
+            f"{unchanged_id}:{unchanged_revision},{missing_id}:1")
+        assert "200" in response.status
+
+        data = json.loads(response.data.decode("utf-8"))
+        assert [post["title"] for post in data["posts"]] == ["New"]
+        assert data["missing"] == [missing_id]
+
+        response = client.get(f"/api/fetch/revisions/?ids={old_id},"
+                              f"{unchanged_revision}&fields=title")
+        assert "200" in response.status
+
+        data = json.loads(response.data.decode("utf-8"))
+        assert data == [{"title": "Old"}, {"title": "Unchanged"}]
+
+
+def test_revisions_are_served_from_fragments_until_changed(app, db):
+    with app.test_client() as client:
+        post = {"title": "A title", "summary": "A summary",
+                "content": "A content"}
+        response = client.post('/api/posts',
+                               content_type='multipart/form-data',
+                               data=post)
+        revision_id = json.loads(response.data.decode("utf-8"))["revision_id"]
+
+        def get_revision():
+            response = client.get(f"/api/revisions/{revision_id}")
+            assert "200" in response.status
+            return json.loads(response.data.decode("utf-8")), \
+                int(response.headers["X-Query-Count"])
+
+        _, uncached = get_revision()
+        data, cached = get_revision()
+
+        assert cached < uncached
+        assert data["files"] == []
+
+        file = {"file": (BytesIO(b"A test"), "test.pdf"),
+                "name": "test.pdf", "post": revision_id}
+        response = client.post('/api/files',
+                               content_type='multipart/form-data',
+                               data=file)
+        assert "200" in response.status
+
+        data, _ = get_revision()
+        assert [file["name"] for file in data["files"]] == ["test.pdf"]
+
+
+def test_fragments_only_load_requested_fields(app, db):
+    from drp import fragments
+
+    with app.test_client() as client:
+        post = {"title": "A title", "summary": "A summary",
+                "content": "A content"}
+        response = client.post('/api/posts',
+                               content_type='multipart/form-data',
+                               data=post)
+        revision_id = json.loads(response.data.decode("utf-8"))["revision_id"]
+
+        response = client.get(f"/api/revisions/{revision_id}?fields=id,title")
+        assert "200" in response.status
+        assert set(fragments.fragments.peek(revision_id)) == {"id", "title"}
+
+        # Fields loaded later are added to those cached
+        response = client.get(f"/api/revisions/{revision_id}?fields=content")
+        assert json.loads(response.data.decode("utf-8")) == \
+            {"content": "A content"}
+        assert set(fragments.fragments.peek(revision_id)) == \
+            {"id", "title", "content"}
+
+
+def test_post_changes_omit_revisions_of_deleted_posts(app, db):
+    with app.test_client() as client:
+        response = client.get("/api/posts/changes")
+        cursor = json.loads(response.data.decode("utf-8"))["cursor"]
+
+        post = {"title": "A title", "summary": "A summary",
+                "content": "A content"}
+        response = client.post('/api/posts',
+                               content_type='multipart/form-data',
+                               data=post)
+        data = json.loads(response.data.decode("utf-8"))
+
+        # Caches the fragment of the revision
+        response = client.get(f"/api/revisions/{data['revision_id']}")
+        assert "200" in response.status
+
+        response = client.delete(f"/api/posts/{data['id']}")
+        assert "204" in response.status
+
+        response = client.get(f"/api/posts/changes?since={cursor}")
+        changes = json.loads(response.data.decode("utf-8"))
+
+        assert changes["revisions"] == []
+        assert changes["deleted"] == [data["id"]]
+
+
+def test_get_posts_from_catalog(app, db, monkeypatch):
+    monkeypatch.setitem(app.config, "CATALOG_ENABLED", True)
+    monkeypatch.setitem(app.config, "CATALOG_LISTEN", False)
+    monkeypatch.setitem(app.config, "CATALOG_MAX_AGE", 3600)
+
+    create_posts(app, db, [Post(title=f"Post {i}", summary="", content="")
+                           for i in range(3)])
+
+    def get(url):
+        response = client.get(url)
+        assert "200" in response.status
+        return json.loads(response.data.decode("utf-8")), \
+            int(response.headers["X-Query-Count"])
+
+    with app.test_client() as client:
+        get("/api/posts")
+        data, queries = get("/api/posts?per_page=2&fields=title")
+
+        assert queries == 0
+        assert data == [{"title": "Post 2"}, {"title": "Post 1"}]
+
+        post = {"title": "Post 3", "summary": "", "content": ""}
+        response = client.post('/api/posts',
+                               content_type='multipart/form-data',
+                               data=post)
+        id = json.loads(response.data.decode("utf-8"))["id"]
+
+        data, _ = get(f"/api/posts/{id}")
+        assert data[0]["title"] == "Post 3"
+
+        data, queries = get(f"/api/fetch/posts/?ids={id}")
+        assert queries == 0
+        assert data[0]["title"] == "Post 3"
+
+
+def test_sql_json_matches_serializers(app, db, monkeypatch):
+    from datetime import datetime, timezone
+
+    with app.app_context():
+        tags = [Tag(name="Sepsis"), Tag(name='"Quoted" \\ tag')]
+        posts = [
+            Post(title="Ünïcödé – “quotes”", summary=None,
+                 content="Line\nTab\t\x01 </script>", is_guideline=None,
+                 created_at=datetime(2020, 6, 1, 12, 0, 0,
+                                     tzinfo=timezone.utc),
+                 tags=tags),
+            Post(title="Second", summary="A summary", content="",
+                 content_html="<p>html</p>", is_guideline=True,
+                 created_at=datetime(2020, 6, 2, 8, 30, 15, 120,
+                                     tzinfo=timezone.utc)),
+        ]
+        db.session.add_all(posts)
+        db.session.add(File(name="file.pdf", filename="file.pdf",
+                            post=posts[1]))
+        db.session.add(File(name=None, filename="other.pdf", post=posts[1]))
+        db.session.commit()
+        ids = ",".join(str(post.post_id) for post in posts)
+
+    urls = ["/api/posts", "/api/posts?fields=title,content_html",
+            f"/api/fetch/posts/?ids={ids}", "/api/search/posts/summary"]
+
+    with app.test_client() as client:
+        expected = []
+        for url in urls:
+            response = client.get(url)
+            assert "200" in response.status
+            expected.append(response.data)
+            cache.clear_all()
+
+        monkeypatch.setitem(app.config, "SQL_JSON", True)
+
+        for url, data in zip(urls, expected):
+            response = client.get(url)
+            assert "200" in response.status
+            assert response.data == data
+            cache.clear_all()
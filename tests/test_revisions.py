@@ -0,0 +1,79 @@
+import sys
+
+from drp import cache, revisions
+from drp.models import Post
+from drp.revisions import make_delta, apply_delta, encode, decode, diff
+
+
+def test_delta_round_trip():
+    base = "First line\nSecond line\nThird line\n"
+    text = "First line\nA new line\nThird line\nLast line"
+
+    ops = make_delta(text, base)
+
+    assert apply_delta(ops, base) == text
+    assert decode(encode(ops)) == ops
+
+
+def test_delta_copies_unchanged_lines():
+    base = "".join(f"Line {i}\n" for i in range(100))
+    text = base.replace("Line 50\n", "Changed\n")
+
+    ops = make_delta(text, base)
+
+    assert ops == [[0, 50], "Changed\n", [51, 100]]
+    assert apply_delta(ops, base) == text
+
+
+def test_delta_of_missing_text():
+    assert make_delta(None, "Some text") is None
+    assert apply_delta(None, "Some text") is None
+    assert apply_delta(make_delta("Some text", None), None) == "Some text"
+
+
+def test_diff_compares_changed_lines_by_word():
+    old = "Give 5mg of drug A.\nMonitor daily.\n"
+    new = "Give 10mg of drug A.\nMonitor daily.\nReview after a week.\n"
+
+    assert diff(old, new) == [
+        ("equal", "Give "),
+        ("delete", "5mg"),
+        ("insert", "10mg"),
+        ("equal", " of drug A.\nMonitor daily.\n"),
+        ("insert", "Review after a week.\n"),
+    ]
+
+
+def test_diff_restores_both_texts():
+    old = "The first line\nA second line\n\nAnd a third"
+    new = "A first line\n\nAnd a third one\nAnd a fourth"
+
+    chunks = diff(old, new)
+
+    assert "".join(t for op, t in chunks if op != "insert") == old
+    assert "".join(t for op, t in chunks if op != "delete") == new
+
+
+def test_text_of_long_histories(app, db):
+    count = sys.getrecursionlimit() + 100
+    contents = [f"Revision {i}\nUnchanged line\n" for i in range(count)]
+
+    with app.app_context():
+        posts = [Post(title="A title", summary="A summary", content=content,
+                      post_id=1, is_current=i == count - 1)
+                 for i, content in enumerate(contents)]
+        db.session.add_all(posts)
+        db.session.flush()
+
+        for revision, base in zip(posts, posts[1:]):
+            revisions.compact(revision, base)
+        db.session.commit()
+
+    # Rebuilt from the deltas, without cached texts or loaded revisions
+    cache.clear_all()
+
+    with app.app_context():
+        oldest = Post.query.filter(Post.post_id == 1) \
+            .order_by(Post.id).first()
+
+        assert revisions.text(oldest).content == contents[0]
@@ -1,6 +1,7 @@
 import json
 
-from drp.models import Post
+from drp import revisions, search as search_vectors
+from drp.models import Post, Tag
 
 
 def add_test_posts(app, db):
@@ -250,3 +251,248 @@ def test_search_high_page(app, db):
         posts = json.loads(response.data.decode("utf-8"))
 
         assert len(posts) == 0
+
+
+def test_search_with_cursor(app, db):
+    add_test_posts(app, db)
+
+    with app.test_client() as client:
+        response = client.get(
+            "/api/search/posts/alpha beta?page=0&results_per_page=2")
+
+        assert "200" in response.status
+
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = client.get(
+            f"/api/search/posts/alpha beta?cursor={cursor}"
+            "&results_per_page=2")
+
+        assert "200" in response.status
+
+        posts = json.loads(response.data.decode("utf-8"))
+
+        assert len(posts) == 1
+        assert posts[0]["title"] == "Test 2"
+        assert "X-Next-Cursor" not in response.headers
+
+
+def test_search_ranks_title_above_content(app, db):
+    with app.app_context():
+        db.session.add(Post(title="Fluid balance", summary="A summary",
+                            content="Monitor sodium closely."))
+        db.session.add(Post(title="Sodium", summary="A summary",
+                            content="Fluid balance."))
+        db.session.commit()
+
+    with app.test_client() as client:
+        response = client.get("/api/search/posts/sodium")
+
+        posts = json.loads(response.data.decode("utf-8"))
+
+        assert [post["title"] for post in posts] == ["Sodium",
+                                                     "Fluid balance"]
+
+
+def test_search_old_revisions_stored_as_deltas(app, db):
+    with app.test_client() as client:
+        id = None
+        for content in ["Give paracetamol.", "Give ibuprofen."]:
+            post = {"title": "Analgesia", "summary": "A summary",
+                    "content": content, "is_guideline": "true"}
+            if id is not None:
+                post["updates"] = str(id)
+
+            response = client.post("/api/posts", data=post,
+                                   content_type="multipart/form-data")
+            id = json.loads(response.data.decode("utf-8"))["id"]
+
+        def search():
+            response = client.get(
+                "/api/search/posts/paracetamol?include_old=true")
+            return json.loads(response.data.decode("utf-8"))
+
+        with app.app_context():
+            old = Post.query.filter(Post.post_id == id,
+                                    Post.is_current.is_(False)).one()
+            assert old.delta is not None
+
+        assert [post["content"] for post in search()] == ["Give paracetamol."]
+
+        with app.app_context():
+            Post.query.update({Post.search_vector: None})
+            db.session.commit()
+
+        # Vectors are written directly, without going through the change log
+        search_vectors.results.clear()
+        assert search() == []
+
+        with app.app_context():
+            assert search_vectors.rebuild(batch_size=1) == 2
+
+        search_vectors.results.clear()
+        assert [post["content"] for post in search()] == ["Give paracetamol."]
+
+
+def test_search_snippets_of_revisions_stored_as_deltas(app, db):
+    id = None
+
+    def add_revisions(client, count):
+        nonlocal id
+        for content in ["Give paracetamol."] * count + ["Give ibuprofen."]:
+            post = {"title": "Analgesia", "summary": "A summary",
+                    "content": content, "is_guideline": "true"}
+            if id is not None:
+                post["updates"] = str(id)
+
+            response = client.post("/api/posts", data=post,
+                                   content_type="multipart/form-data")
+            id = json.loads(response.data.decode("utf-8"))["id"]
+
+    def search(client):
+        # Texts are rebuilt by both searches
+        revisions.history.clear()
+        search_vectors.results.clear()
+
+        response = client.get(
+            "/api/search/posts/paracetamol?include_old=true&snippets=true")
+        assert "200" in response.status
+
+        snippets = [post["snippet"] for post in json.loads(
+            response.data.decode("utf-8"))]
+        assert all("**paracetamol**" in snippet for snippet in snippets)
+
+        return len(snippets), int(response.headers["X-Query-Count"])
+
+    with app.test_client() as client:
+        add_revisions(client, 2)
+        count, queries = search(client)
+        assert count == 2
+
+        # Headlines are made by one query however many revisions are deltas
+        add_revisions(client, 4)
+        assert search(client) == (6, queries)
+
+
+def test_search_facets(app, db, monkeypatch):
+    with app.app_context():
+        adults = Tag(name="Adults")
+        children = Tag(name="Children")
+        db.session.add(Post(title="Sepsis", summary="Sepsis in adults",
+                            content="A content", is_guideline=True,
+                            tags=[adults]))
+        db.session.add(Post(title="Sepsis", summary="Sepsis in children",
+                            content="A content", is_guideline=True,
+                            tags=[adults, children]))
+        db.session.add(Post(title="Sepsis audit", summary="A summary",
+                            content="A content", is_guideline=False))
+        db.session.add(Post(title="Asthma", summary="A summary",
+                            content="A content", tags=[children]))
+        db.session.commit()
+
+    with app.test_client() as client:
+        for sql_json in [False, True]:
+            monkeypatch.setitem(app.config, "SQL_JSON", sql_json)
+            response = client.get(
+                "/api/search/posts/sepsis?facets=true&page=0"
+                "&results_per_page=1")
+
+            assert "200" in response.status
+
+            data = json.loads(response.data.decode("utf-8"))
+
+            assert len(data["posts"]) == 1
+            assert data["total"] == 3
+            assert data["facets"] == {
+                "tags": {"Adults": 2, "Children": 1},
+                "is_guideline": {"true": 2, "false": 1},
+            }
+
+        response = client.get(
+            "/api/search/posts/sepsis?facets=true&tag=Children")
+        data = json.loads(response.data.decode("utf-8"))
+
+        assert data["total"] == 1
+        assert data["facets"]["tags"] == {"Adults": 1, "Children": 1}
+
+
+def test_search_results_are_cached(app, db):
+    add_test_posts(app, db)
+
+    with app.test_client() as client:
+        def search(searched):
+            response = client.get(f"/api/search/posts/{searched}")
+            assert "200" in response.status
+            posts = json.loads(response.data.decode("utf-8"))
+            return [post["title"] for post in posts]
+
+        titles = search("elephant")
+        hits = search_vectors.results.stats()["hits"]
+
+        # Normalizes to the same text search query
+        assert search("The Elephants!") == titles
+        assert search_vectors.results.stats()["hits"] == hits + 1
+
+        post = {"title": "Elephant", "summary": "A summary",
+                "content": "A content"}
+        response = client.post("/api/posts", data=post,
+                               content_type="multipart/form-data")
+        assert "200" in response.status
+
+        assert search("elephant") == ["Elephant"] + titles
+
+
+def test_search_suggestions(app, db):
+    with app.app_context():
+        db.session.add(Tag(name="Sepsis"))
+        db.session.add(Post(title="Sepsis in adults", summary="A summary",
+                            content="A content"))
+        db.session.add(Post(title="Neutropenic sepsis", summary="A summary",
+                            content="A content"))
+        db.session.add(Post(title="Asthma", summary="A summary",
+                            content="A content"))
+        db.session.commit()
+
+    with app.test_client() as client:
+        def suggest(typed):
+            response = client.get(f"/api/search/suggest?q={typed}")
+            assert "200" in response.status
+            return [(s["kind"], s["text"])
+                    for s in json.loads(response.data.decode("utf-8"))]
+
+        assert suggest("seps") == [("tag", "Sepsis"),
+                                   ("post", "Sepsis in adults"),
+                                   ("post", "Neutropenic sepsis")]
+
+        # Tolerates typos
+        assert suggest("asthmaa") == [("post", "Asthma")]
+
+        # Like wildcards are matched literally
+        assert suggest("%") == []
+
+        response = client.get("/api/search/suggest?q=seps&limit=0")
+        assert "400" in response.status
+
+
+def test_search_snippets(app, db):
+    add_test_posts(app, db)
+
+    with app.test_client() as client:
+        response = client.get(
+            "/api/search/posts/elephant?snippets=true&page=0"
+            "&results_per_page=1")
+
+        assert "200" in response.status
+
+        posts = json.loads(response.data.decode("utf-8"))
+
+        assert len(posts) == 1
+        assert "content" not in posts[0]
+        assert "**elephant**" in posts[0]["snippet"]
+        assert len(posts[0]["snippet"]) < 400
+
+        response = client.get(
+            "/api/search/posts/elephant?snippets=true&fields=title")
+        posts = json.loads(response.data.decode("utf-8"))
+
+        assert [set(post) for post in posts] == [{"title", "snippet"}] * 2